@@ -1,5 +1,67 @@
 
+import functools
+
+import numpy as np
+
 from . import si
 
 # Enumerate site curve subclasses
 curves = {c.__curve_name__:c for c in si.SiteCurve.__subclasses__()}
+
+def get_curve(curve, variant=None, species=None, forest_code=0):
+    """
+    Return a site curve instance, reusing instances for repeated arguments.
+
+    Useful when looping over inventory records so the curve (and any FVS
+    library setup) is only initialized once per curve, variant, and species.
+    Instances are shared, so callers should not alter their state, e.g.
+    `DF_SMC_SiteCurve.set_density`.
+
+    Args
+    ----
+    curve: Site curve name, see `curves`.
+    variant: FVS variant abbreviation when curve="fvs".
+    species: FVS species code when curve="fvs".
+    forest_code: FVS forest code when curve="fvs".
+    """
+    if variant is not None:
+        variant = variant.lower()
+
+    return _get_curve(curve.lower(), variant, species, forest_code)
+
+@functools.lru_cache(maxsize=64)
+def _get_curve(curve, variant, species, forest_code):
+    return curves[curve](variant, species, forest_code=forest_code)
+
+def warmup(*names):
+    """
+    Compile, or load from the Numba cache, the jitted kernels of site curves.
+
+    Numba compiles on first call, so the first estimate from each curve can
+        stall for a moment. Long running processes can call this up front to
+        move that cost to a predictable point. Nothing is done if Numba is
+        not installed or for curves without jitted kernels.
+
+    Args
+    ----
+    names: Names of the curves to warm up, see `curves`. All available
+        curves are warmed up if no names are given.
+    """
+    if not si.HAS_NUMBA:
+        return
+
+    for key in (names or curves.keys()):
+        c = curves[key.lower()]
+        if c._njit_height is None or not c.available():
+            continue
+
+        sc = get_curve(key)
+        age = float(sc.index_age)
+        s = 0.5 * (sc.min_si + sc.max_si)
+        ht = sc.height(age, s)
+
+        # Scalar and array forms of the height and search kernels
+        sc.v_height(np.array([age]), s)
+        sc.site_index(age, ht)
+        sc.find_si(age, ht)
+        sc.find_bha(s, ht)
@@ -5,14 +5,10 @@ Site index command line utilities.
 import os
 import sys
 
-import matplotlib
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import click
 
 import pysiteindex
-import pysiteindex.si
 from pysiteindex import curves
 
 # Declare the package name if needed
@@ -24,45 +20,73 @@ if __name__ == '__main__' and __package__ is None:
     importlib.import_module(__package__)
 
 def curve_docs():
-    keys = sorted(pysiteindex.curves.keys())
+    keys = sorted(curves.keys())
     # msg = 'Available Site Index Curves:\n'
     docs = []
     for key in keys:
-        sf = pysiteindex.curves[key]
-        try:
-            if key=='fvs':
-                sc = sf('PN','DF',708)
-            else:
-                sc = sf()
-
-            ds = sc.__doc__.strip().split('\n')[0]
-
-        except:
-            # ds = '* Not Installed *'
-            # key = f'*{key}'
+        sf = curves[key]
+        # Skip curves that depend on libraries that are not installed
+        if not sf.available():
             continue
 
+        # Read the description from the class to avoid loading curve libraries
+        ds = (sf.__doc__ or '').strip().split('\n')[0]
         docs.append(f'{key}: {ds}')
 
     docs = '\n  '.join(docs)
     msg = f'Site Index Curves:\n  {docs}'
     return msg
 
+def read_batch(batch, columns):
+    """
+    Return a DataFrame of trees read from a batch CSV file.
+
+    Args
+    ----
+    batch: Path to a CSV file with a header row.
+    columns: Column names the file must include.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(batch)
+    missing = [c for c in columns if not c in df.columns]
+    if missing:
+        raise click.UsageError(
+                f'Batch file {batch} is missing column(s): {", ".join(missing)}')
+
+    return df
+
 @click.command()
 @click.option('--curve', '-c', required=True, help='Site curve name.')
-@click.option('--age', '-a', required=True, type=float, help='Tree age - BHA, TTA, etc. see curve description.')
-@click.option('--height', '-t', required=True, type=float, help='Tree height - See curve description.')
+@click.option('--age', '-a', required=False, type=float, help='Tree age - BHA, TTA, etc. see curve description.')
+@click.option('--height', '-t', required=False, type=float, help='Tree height - See curve description.')
 @click.option('--variant', '-v', required=False, type=str, help='FVS variant abbreviation when curve="fvs".')
 @click.option('--forest', '-f', required=False, type=int, default=0, help='FVS forest code when curve="fvs".')
 @click.option('--species', '-s', required=False, type=str, help='FVS species code when curve="fvs".')
-def si(curve, age, height, variant=None, forest=0, species=None):
+@click.option('--batch', '-b', required=False, type=click.Path(exists=True, dir_okay=False), help='CSV file with "age" and "height" columns, estimated in one call.')
+def si(curve, age, height, variant=None, forest=0, species=None, batch=None):
     """
-    Return a site index estimate for a single tree.
+    Return a site index estimate for a single tree, or a batch of trees.
+
+    With --batch the file is written to stdout with a "site_index" column
+        appended.
     """
     if curve.lower()=='fvs' and species is None:
         raise AttributeError('A valid species is required for curve=="fvs"')
 
-    sc = curves[curve.lower()](variant.lower(), species, forest_code=forest)
+    if batch is None and (age is None or height is None):
+        raise click.UsageError('--age and --height are required without --batch')
+
+    sc = pysiteindex.get_curve(curve, variant, species, forest_code=forest)
+
+    if batch is not None:
+        df = read_batch(batch, ('age', 'height'))
+        df['site_index'] = sc.v_site_index(
+                df['age'].to_numpy(dtype=np.float64)
+                , df['height'].to_numpy(dtype=np.float64))
+        print(df.to_csv(index=False), end='')
+        return
+
     si = sc.site_index(age, height)
     if sc.index_bha:
         ref = 'bha'
@@ -73,14 +97,18 @@ def si(curve, age, height, variant=None, forest=0, species=None):
 
 @click.command()
 @click.option('--curve', '-c', required=True, help='Site curve name.')
-@click.option('--age', '-a', required=True, multiple=True, type=float, help='Tree age - BHA, TTA, etc. see curve description.')
-@click.option('--site-index', '-i', required=True, type=float, help='Site index - See curve description.')
+@click.option('--age', '-a', required=False, multiple=True, type=float, help='Tree age - BHA, TTA, etc. see curve description.')
+@click.option('--site-index', '-i', required=False, type=float, help='Site index - See curve description.')
 @click.option('--variant', '-v', required=False, type=str, help='FVS variant abbreviation when curve="fvs".')
 @click.option('--forest', '-f', required=False, type=int, default=0, help='FVS forest code when curve="fvs".')
 @click.option('--species', '-s', required=False, type=str, help='FVS species code when curve="fvs".')
-def ht(curve, age, site_index, variant=None, forest=0, species=None):
+@click.option('--batch', '-b', required=False, type=click.Path(exists=True, dir_okay=False), help='CSV file with "age" and "site_index" columns, estimated in one call.')
+def ht(curve, age, site_index, variant=None, forest=0, species=None, batch=None):
     """
     Return an estimated height for a single tree of a given age and site index.
+
+    With --batch the file is written to stdout with a "height" column
+        appended.
     """
     if curve.lower()=='fvs' and species is None:
         raise AttributeError('A valid species is required for curve=="fvs"')
@@ -88,19 +116,28 @@ def ht(curve, age, site_index, variant=None, forest=0, species=None):
     if curve.lower()=='fvs' and not variant:
         raise AttributeError('A FVS variant (e.g. -v=pn) is required for curve=="fvs"')
 
-    sc = curves[curve.lower()](variant.lower(), species, forest_code=forest)
+    if batch is None and (not age or site_index is None):
+        raise click.UsageError('--age and --site-index are required without --batch')
+
+    sc = pysiteindex.get_curve(curve, variant, species, forest_code=forest)
+
+    if batch is not None:
+        df = read_batch(batch, ('age', 'site_index'))
+        df['height'] = sc.v_height(
+                df['age'].to_numpy(dtype=np.float64)
+                , df['site_index'].to_numpy(dtype=np.float64))
+        print(df.to_csv(index=False), end='')
+        return
 
     if sc.index_bha:
         ref = 'bha'
     else:
         ref = 'tta'
 
-    hts = {}
-    for a in age:
-        ht = sc.height(a, site_index)
-        hts[a] = ht
+    # Estimate all ages in a single vectorized call
+    hts = sc.v_height(np.asarray(age, dtype=np.float64), site_index)
 
-    for a,ht in hts.items():
+    for a,ht in zip(age, hts):
         print('{:.2f}{} @{}={}'.format(ht, sc.units, ref, a))
 
 @click.group(invoke_without_command=True)
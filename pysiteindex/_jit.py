@@ -0,0 +1,85 @@
+"""
+Optional Numba JIT helpers.
+
+Numba is not required by pysiteindex.  When it is not installed the
+decorators defined here return the decorated function unchanged, so the
+plain Python/NumPy implementations are used instead.
+"""
+
+import functools
+
+import numpy as np
+
+try:
+    import numba
+    HAS_NUMBA = True
+
+except ImportError:
+    numba = None
+    HAS_NUMBA = False
+
+def njit(*args, **kwargs):
+    """
+    Wrap `numba.njit`, or return the function unchanged if Numba is missing.
+
+    Supports both the bare `@njit` and the `@njit(...)` decorator forms.
+    """
+    if HAS_NUMBA:
+        return numba.njit(*args, **kwargs)
+
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+        return args[0]
+
+    return lambda func: func
+
+if HAS_NUMBA:
+    prange = numba.prange
+
+else:
+    prange = range
+
+def guvectorize(ftylist, signature, **kwargs):
+    """
+    Wrap `numba.guvectorize`, or emulate it with `np.vectorize`.
+
+    Without Numba only kernels with a single output shaped like the first
+    input are supported, e.g. the '(n),()->(n)' layout.
+    """
+    if HAS_NUMBA:
+        return numba.guvectorize(ftylist, signature, **kwargs)
+
+    def decorator(func):
+        def pyfunc(*args):
+            out = np.empty(np.shape(args[0]), dtype=np.float64)
+            func(*args, out)
+            return out
+
+        return np.vectorize(pyfunc, signature=signature, doc=func.__doc__)
+
+    return decorator
+
+def vectorize(ftylist, **kwargs):
+    """
+    Wrap `numba.vectorize`, or fall back to `np.vectorize` without Numba.
+
+    The fallback passes `np.float64` scalars to the kernel and ignores
+    floating point errors, so division by zero returns inf or nan as the
+    Numba ufuncs do rather than raising `ZeroDivisionError`.
+    """
+    if HAS_NUMBA:
+        return numba.vectorize(ftylist, **kwargs)
+
+    def decorator(func):
+        def pyfunc(*args):
+            return func(*[np.float64(x) for x in args])
+
+        vfunc = np.vectorize(pyfunc, otypes=[np.float64])
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                return vfunc(*args)
+
+        return wrapper
+
+    return decorator
@@ -1,4 +1,42 @@
 # Implement Site index functions
+
+import warnings
+
+import numpy as np
+
+from ._jit import njit, vectorize, guvectorize
+from .si import _KING_COEFS
+
+# Signature of the scalar kernels compiled to ufuncs, f(bha, x) -> y
+_UFUNC_SIGS = ['float64(float64, float64)']
+
+# Equation coefficients, bound once at import and treated as constants by Numba
+# King (1966) a0, a1, b0, b1, c0, c1 are shared with pysiteindex.si
+
+# Wiley (1978): b0, b1, b2, b3, b4, b5 (FVS PN naming)
+_WILEY_FVS_COEFS = (-1.7307, 0.1394, -0.0616, 0.0137, 0.00192, 0.00007)
+
+# Harrington and Curtis (1985) site index regression: a0, a1, a2, a3, b0, b1, b2
+_HARRINGTON_SI_COEFS = (54.1850, -4.61694, 0.11065, -0.0007633, 1.25934, -0.012989, 3.5220)
+
+# Lower end of the find_age search, kept above zero since several height
+#   functions divide by age
+_MIN_AGE = 1.0e-6
+
+@njit(cache=True, fastmath=True)
+def _king_ab(bha):
+    """
+    Return the King (1966) polynomials in bha, factored by z50.
+    
+    Total height is bha**2/(a + z50*b) + 4.5 where a, b are returned.
+    """
+    a0, a1, b0, b1, c0, c1 = _KING_COEFS
+    
+    a = a0 + bha*(b0 + bha*c0)
+    b = a1 + bha*(b1 + bha*c1)
+    return a, b
+
+@vectorize(_UFUNC_SIGS, nopython=True, fastmath=True, cache=True)
 def df_king_ht(bha,si50):
     """
     Return total height given breast height age and 50 year site index using King (1966).
@@ -6,22 +44,16 @@ def df_king_ht(bha,si50):
     Ref. King (1966)
     """
 
-    a0 = -0.954038
-    a1 = 0.109757
-    b0 = 0.0558178
-    b1 = 0.00792236
-    c0 = -0.000733819
-    c1 = 0.000197693
-
+    # Factor the coefficient predictors by z50 so each polynomial in bha
+    #   is evaluated once in Horner form
     z50 = 2500/(si50-4.5)
-    a = a0 + a1*z50
-    b = b0 + b1*z50
-    c = c0 + c1*z50
+    a, b = _king_ab(bha)
     
-    ht = (bha*bha) / (a + b*bha + c*(bha*bha)) + 4.5
+    ht = bha*bha / (a + z50*b) + 4.5
     
     return ht
 
+@vectorize(_UFUNC_SIGS, nopython=True, fastmath=True, cache=True)
 def df_king_si(bha, ht):
     """
     Return King's site index given total height and breast height age.
@@ -29,20 +61,40 @@ def df_king_si(bha, ht):
     This solves King's total height formula for site index by substituting 
         the coeffient predictor equations and factoring out Z for age 50
     """
-    a0 = -0.954038
-    a1 = 0.109757
-    b0 = 0.0558178
-    b1 = 0.00792236
-    c0 = -0.000733819
-    c1 = 0.000197693
-
-    i = bha**2/(ht-4.5)
-    j = i - a0 - b0*bha - c0*bha**2
-    k = a1 + b1*bha + c1*bha**2
-    si = 4.5 + 2500 * (k/j)
+    a, b = _king_ab(bha)
+
+    j = bha*bha/(ht-4.5) - a
+    si = 4.5 + 2500 * (b/j)
     return si
 
-def df_curtis_ht(bha, si):
+def df_king_both(bha, si=None, ht=None):
+    """
+    Return King (1966) total height and site index sharing the bha polynomials.
+    
+    Height is computed from `si` and site index from `ht`; the direction
+        not requested is returned as None.  Pass a column of ages and a row
+        of site indexes or heights (e.g. bha[:,None], si[None,:]) to
+        evaluate a table with the age polynomials computed once per age.
+    
+    Return
+    ------
+    (ht, si)
+    """
+    a, b = _king_ab(bha)
+    bha2 = bha*bha
+    
+    ht_est = None
+    if si is not None:
+        ht_est = bha2 / (a + (2500/(si-4.5))*b) + 4.5
+    
+    si_est = None
+    if ht is not None:
+        si_est = 4.5 + 2500 * (b/(bha2/(ht-4.5) - a))
+    
+    return ht_est, si_est
+
+@guvectorize(['void(f8[:], f8, f8[:])'], '(n),()->(n)', cache=True)
+def df_curtis_ht(bha, si, ht):
     """Curtis, et al, 1974"""
     a = 0.6192
     b = -5.3394
@@ -50,68 +102,73 @@ def df_curtis_ht(bha, si):
     d = 3368.9
     n = -1.4
     
-    bha[bha<=0] = 1
-    
-    ht = 4.5 + (si-4.5)/(a + b/(si-4.5) + c*bha**n + d/(si-4.5)*bha**n)
+    si45 = si-4.5
+    for i in range(bha.shape[0]):
+        if bha[i]<=0:
+            ht[i] = 4.5
+        else:
+            ht[i] = 4.5 + si45/(a + b/si45 + (c + d/si45)*bha[i]**n)
+
+@njit(cache=True, fastmath=True)
+def _ra_harrington_ab(bha):
+    """
+    Return the Harrington and Curtis (1985) polynomials in bha.
     
-    ht[bha<=0] = 4.5
+    Site index is a + b*ht where a, b are returned.
+    """
+    a0, a1, a2, a3, b0, b1, b2 = _HARRINGTON_SI_COEFS
     
-    return ht
+    inv = 1.0/bha
+    a = a0 + bha*(a1 + bha*(a2 + bha*a3))
+    b = b0 + b1*bha + b2*inv*inv*inv
+    return a, b
 
+@vectorize(_UFUNC_SIGS, nopython=True, fastmath=True, cache=True)
 def ra_harringtion_si(bha, ht):
     """
     Return 20 year site index for red alder
     
     Ref: Harrington and Curtis (1985).
     """
-    a0 = 54.1850
-    a1 = -4.61694
-    a2 = 0.11065
-    a3 = -0.0007633
-    b0 = 1.25934
-    b1 = -0.012989
-    b2 = 3.5220
-    
-    a = a0 + a1*bha + a2*bha**2 + a3*bha**3
-    b = b0 + b1*bha + b2*(1/bha)**3
+    a, b = _ra_harrington_ab(bha)
     si = a + b*ht
     
     return si
 
+@vectorize(_UFUNC_SIGS, nopython=True, fastmath=True, cache=True)
 def ra_harringtion_ht(bha, si):
     """
     Return total height for red alder.  *20 year site index.
     
     Ref: Harrington and Curtis (1985).
     """
-    a0 = 54.1850
-    a1 = -4.61694
-    a2 = 0.11065
-    a3 = -0.0007633
-    b0 = 1.25934
-    b1 = -0.012989
-    b2 = 3.5220
-    
-    a = a0 + a1*bha + a2*bha**2 + a3*bha**3
-    b = b0 + b1*bha + b2*(1/bha)**3
+    a, b = _ra_harrington_ab(bha)
     ht = (si-a)/b
     
     return ht
     
+@vectorize(_UFUNC_SIGS, nopython=True, fastmath=True, cache=True)
 def nf_fia_si(bha, ht):
     """
     FIA Eq. 4, Noble fir
     """
-    if bha<=100:
-        si = (4.5 + 0.2145*(100-bha) + 0.0089*(100-bha)**2)
-        si += ((1.0 + 0.00386*(100-bha) + 1.2518*(100-bha)**5)/10**10)*(ht-4.5)
-    else:
-        si = -62.755 + 672.55*(1/bha)**0.5
-        si += (0.9484 + 516.49*(1/bha)**2) * (ht-4.5)
-        si += (-0.00144 + 0.1442*(1/bha)) * (ht-4.5)
+    # Each ufunc element evaluates both segments, then picks one by age
+    d = 100-bha
+    d2 = d*d
+    si_lo = (4.5 + 0.2145*d + 0.0089*d2)
+    si_lo += ((1.0 + 0.00386*d + 1.2518*d2*d2*d)*1.0e-10)*(ht-4.5)
+    
+    # np.divide returns inf rather than raising for bha==0
+    inv = np.divide(1.0, bha)
+    si_hi = -62.755 + 672.55*np.sqrt(inv)
+    si_hi += (0.9484 + 516.49*inv*inv) * (ht-4.5)
+    si_hi += (-0.00144 + 0.1442*inv) * (ht-4.5)
+    
+    si = si_lo if bha<=100 else si_hi
     
     return si
     
+@vectorize(_UFUNC_SIGS, nopython=True, fastmath=True, cache=True)
 def ra_fia_si(bha, ht):
     """
     FIA Eq. 13, Red alder and other hardwoods.
@@ -119,114 +176,233 @@ def ra_fia_si(bha, ht):
     si = (0.60924 + 19.538/bha) * ht
     return si
 
+@vectorize(_UFUNC_SIGS, nopython=True, fastmath=True, cache=True)
 def wh_fvs_ht(bha, si):
     """
     FVS PN implementation of Wiley, 1978
     """
-    b0 = -1.7307
-    b1 = 0.1394
-    b2 = -0.0616
-    b3 = 0.0137
-    b4 = 0.00192
-    b5 = 0.00007
+    b0, b1, b2, b3, b4, b5 = _WILEY_FVS_COEFS
     
     z = 2500.0/(si-4.5)
-    ht = (bha**2.0/(b0 + b1*z + (b2 + b3*z)*bha + (b4 + b5*z)*(bha**2.0))) + 4.5
+    bha2 = bha*bha
+    ht = bha2/((b0 + bha*(b2 + bha*b4)) + z*(b1 + bha*(b3 + bha*b5))) + 4.5
     return ht
 
+@vectorize(_UFUNC_SIGS, nopython=True, fastmath=True, cache=True)
 def wh_fvs_si(bha, ht):
     """
     FVS PN implementation of Wiley, 1978
     """
     
-    b0 = -1.7307
-    b1 = 0.1394
-    b2 = -0.0616
-    b3 = 0.0137
-    b4 = 0.00192
-    b5 = 0.00007
+    b0, b1, b2, b3, b4, b5 = _WILEY_FVS_COEFS
     
-    i = b1 + b3*bha + b5*bha**2.0
-    j = b0 + b2*bha + b4*bha**2.0
-    k = bha**2.0 / (ht-4.5)
+    i = b1 + bha*(b3 + bha*b5)
+    j = b0 + bha*(b2 + bha*b4)
+    k = bha*bha / (ht-4.5)
     si = 2500.0 * (i/(k-j)) + 4.5
     return si
 
+@vectorize(_UFUNC_SIGS, nopython=True, fastmath=True, cache=True)
 def wh_fia_si(bha, ht):
     """
     FIA Eq. 5, BHA<=120 Wiley (1978); BHA>120 Barnes (1962)
     """
     
-    if bha<=120:
-        # Wiley (1978)
-        a0=0.1394
-        b0=0.0137
-        c0=0.00007
-        a1=-1.7307
-        b1=-0.0616
-        c1=0.00192
+    # Each ufunc element evaluates both equations, then picks one by age
+    
+    # Wiley (1978)
+    a1, a0, b1, b0, c1, c0 = _WILEY_FVS_COEFS
 
-        i = (ht-4.5) * (a0 + b0*bha + c0*bha**2)
-        j = bha**2 - (ht-4.5)*(a1 + b1*bha + c1*bha**2)
-        si = 2500 * (i/j) + 4.5
+    i = (ht-4.5) * (a0 + bha*(b0 + bha*c0))
+    j = bha*bha - (ht-4.5)*(a1 + bha*(b1 + bha*c1))
+    si_wiley = 2500 * (i/j) + 4.5
+    
+    # Barnes (1962), log(bha**2) = 2*log(bha) folded into the coefficient
+    si_barnes = 4.5 + 22.6 * np.exp((0.014482 - 0.002324*np.log(bha)) * (ht-4.5))
     
-    else:
-        # Barnes (1962)
-        si = 4.5 + 22.6 * math.exp((0.014482 - 0.001162*math.log(bha**2)) * (ht-4.5))
+    si = si_wiley if bha<=120 else si_barnes
     
     return si
 
+@vectorize(_UFUNC_SIGS, nopython=True, fastmath=True, cache=True)
 def wh_fia_ht(bha,si):
     ##TODO: include the Barnes eq for trees >120 years
     """
     Wiley (1978) Solved for height
     """
-    a0=0.1394
-    b0=0.0137
-    c0=0.00007
-    a1=-1.7307
-    b1=-0.0616
-    c1=0.00192
+    a1, a0, b1, b0, c1, c0 = _WILEY_FVS_COEFS
 
     z = 2500/(si-4.5)
-    i = a0 + b0*bha + c0*bha**2
-    j = a1 + b1*bha + c1*bha**2
-    h = bha**2 / (z*i + j) + 4.5
+    i = a0 + bha*(b0 + bha*c0)
+    j = a1 + bha*(b1 + bha*c1)
+    h = bha*bha / (z*i + j) + 4.5
     return h
 
-def find_age(ht_func, si, ht, max_age=300.0, steps=10, ht_err=0.5):
+def _newton_age(ht_func, si, ht, max_age, steps, eps, age_tol):
+    """
+    Return breast height age using safeguarded Newton-Raphson iterations.
+    
+    A forward difference derivative of `ht_func` is used.  A bracket around
+        the solution is narrowed each iteration and the bracket is bisected
+        whenever a Newton step would leave it.  Iterations stop once every
+        step is within `age_tol`, or after `steps` iterations.
+    
+    Returns the ages and a mask of the converged elements.
+    """
+    # If ht_func is not monotonic this will fail
+    age_low = np.full(si.shape, _MIN_AGE)
+    age_high = np.full(si.shape, max_age)
+    age = (age_low + age_high) * 0.5
+    done = np.zeros(si.shape, dtype=bool)
+    
+    for i in range(steps):
+        ht_age = ht_func(age, si)
+        
+        # Move the upper bound down if the age overshot the height,
+        #   otherwise move the lower bound up
+        overshot = ht<ht_age
+        age_high = np.where(overshot, age, age_high)
+        age_low = np.where(overshot, age_low, age)
+        
+        dht = (ht_func(age + eps, si) - ht_age) / eps
+        step = age - (ht_age-ht)/dht
+        
+        inside = (step>=age_low) & (step<=age_high)
+        step = np.where(inside, step, (age_low + age_high) * 0.5)
+        
+        done = (np.abs(step-age)<=age_tol) | (ht_age==ht)
+        age = step
+        if done.all():
+            break
+    
+    return age, done
+
+def _chandrupatla_age(ht_func, si, ht, max_age, steps, age_tol, f0, f1):
+    """
+    Return breast height age using Chandrupatla's bracketed root finder.
+    
+    Inverse quadratic interpolation is used when it is within the bracket,
+        otherwise the bracket is bisected.  Elements are frozen once the
+        bracket is narrower than `age_tol`, and iterations stop when every
+        element is frozen, or after `steps` iterations.  `f0` and `f1` are
+        the height errors at the ends of the search, which must bracket the
+        root.
+    
+    Returns the ages and a mask of the converged elements.
+    
+    Ref: Chandrupatla (1997), Advances in Engineering Software 28(3).
+    """
+    # b is the most recent estimate, a the previous estimate, and c the
+    #   far end of the bracket [b, c]
+    b = np.full(si.shape, _MIN_AGE)
+    a = np.full(si.shape, max_age)
+    c = a
+    fb = f0
+    fa = f1
+    fc = fa
+    t = np.full(si.shape, 0.5)
+    
+    age = np.where(np.abs(fa)<np.abs(fb), a, b)
+    done = (fa==0.0) | (fb==0.0)
+    
+    for i in range(steps):
+        if done.all():
+            break
+        
+        xt = a + t*(b-a)
+        ft = ht_func(xt, si) - ht
+        
+        # Keep the end of the bracket on the other side of the root
+        same = np.sign(ft)==np.sign(fa)
+        c, fc = np.where(same, a, b), np.where(same, fa, fb)
+        b, fb = np.where(same, b, a), np.where(same, fb, fa)
+        a, fa = xt, ft
+        
+        best = np.abs(fa)<np.abs(fb)
+        age = np.where(done, age, np.where(best, a, b))
+        fm = np.where(best, fa, fb)
+        
+        tlim = age_tol / np.abs(b-c)
+        done |= (tlim>0.5) | (fm==0.0)
+        
+        # Use inverse quadratic interpolation if it will stay in the bracket
+        xi = (a-b)/(c-b)
+        phi = (fa-fb)/(fc-fb)
+        iqi = (phi*phi<xi) & ((1.0-phi)*(1.0-phi)<1.0-xi)
+        t = np.where(iqi
+                , fa/(fb-fa) * fc/(fb-fc) + (c-a)/(b-a) * fa/(fc-fa) * fb/(fc-fb)
+                , 0.5)
+        t = np.clip(t, tlim, 1.0-tlim)
+        t = np.where(done, 0.5, t)
+    
+    return age, done
+
+def find_age(ht_func, si, ht, max_age=300.0, steps=50, ht_err=None
+        , method='chandrupatla', eps=1.0e-3, age_tol=1.0e-6):
     """
     Return approximate breast height age given a height function, site index, and total height.
+    
+    `si` and `ht` may be scalars or arrays, in which case the search is
+        performed on all elements at once and `ht_func` must accept arrays.
+        Heights above the curve at `max_age` return `max_age`, heights below
+        the curve at age 0 return 0, and missing values return NaN.  The
+        remaining elements are searched until they converge to `age_tol`, a
+        RuntimeWarning is issued for any that do not within `steps`.
+    
+    Args
+    ----
+    ht_func: Function to estimate height given an age and site index.
+    si: Site index
+    ht: Total height
+    max_age: Maximum possible breast height age.
+    steps: Maximum number of search iterations to perform.
+    ht_err: Deprecated and ignored, convergence is controlled by `age_tol`.
+    method: 'chandrupatla' (one ht_func call per step) or 'newton'
+        (safeguarded Newton-Raphson, two ht_func calls per step).
+    eps: Age increment of the Newton derivative approximation.
+    age_tol: Age tolerance of the search.
     """
     
-    # Locate the approximate age using a binary search
-    # If ht_func is not monotonic this will fail
-    age_high = max_age
-    age_low = 0.0
-    age_mid = max_age * 0.5
+    if ht_err is not None:
+        warnings.warn('find_age ht_err is ignored and will be removed, '
+                'use age_tol to control the search.'
+                , DeprecationWarning, stacklevel=2)
+    
+    if method not in ('chandrupatla', 'newton'):
+        raise ValueError('Unknown find_age method: {}'.format(method))
     
-    # Pre-define the half steps
-    steps = (0.5**np.arange(1,steps+1,1)) * age_mid
+    si, ht = np.broadcast_arrays(
+            np.asarray(si, dtype=np.float64), np.asarray(ht, dtype=np.float64))
     
-    for step in steps:
-        # Calculate the mid-point to test
-        ht_mid = ht_func(age_mid, si)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Height errors at the ends of the search range
+        f0 = ht_func(np.full(si.shape, _MIN_AGE), si) - ht
+        f1 = ht_func(np.full(si.shape, max_age), si) - ht
         
-        # If the absolute error is within the defined tolerance, we're done
-        if abs(ht_mid-ht)<ht_err:
-            break
-            
-        if ht<ht_mid:
-            # If the mid-point overshot the height
-            #   reduce the age by a half step
-            age_high = age_mid
-            age_mid = age_mid - step
-        else:
-            # Otherwise increase the age by a half step
-            age_low = age_mid
-            age_mid = age_mid + step
+        # Saturate heights outside of the curve, then search the rest
+        age = np.where(f1<0.0, max_age, 0.0)
+        age[np.isnan(f0) | np.isnan(f1)] = np.nan
         
-    return age_mid
+        bracketed = (f0<=0.0) & (f1>=0.0)
+        if np.any(bracketed):
+            if method=='chandrupatla':
+                x, done = _chandrupatla_age(
+                        ht_func, si[bracketed], ht[bracketed], max_age, steps
+                        , age_tol, f0[bracketed], f1[bracketed])
+            
+            else:
+                x, done = _newton_age(
+                        ht_func, si[bracketed], ht[bracketed], max_age, steps
+                        , eps, age_tol)
+            
+            age[bracketed] = x
+            
+            if not done.all():
+                warnings.warn('find_age did not converge for {} of {} values '
+                        'in {} steps.'.format(np.sum(~done), done.size, steps)
+                        , RuntimeWarning, stacklevel=2)
+    
+    return age[()]
 
 # age = 60
 # si = 120
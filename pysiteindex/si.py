@@ -9,17 +9,24 @@ from __future__ import print_function, division
 import os
 import sys
 import abc
+import types
+from functools import cached_property, lru_cache
 import numpy as np
-import pandas as pd
-from matplotlib import pyplot as plt
 from builtins import iter
 import logging
 
+from ._jit import njit, prange, HAS_NUMBA
+
 try:
     import smc_dfsite
 except:
     pass
 
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
 try:
     import pyfvs.fvs
 
@@ -27,6 +34,160 @@ except:
     logging.warn('PyFVS is not available')
     pass
 
+def _secant_search(resid, x0, f0, x1, f1, done, tol, max_iters):
+    """
+    Return the roots of an increasing function bracketed by x0, x1.
+
+    A vectorized secant search safeguarded by the bracket, steps falling
+        outside of the bracket are replaced by bisection. Each element is
+        frozen once its residual is within tol, or at NaN if the residual
+        is NaN.
+
+    Args
+    ----
+    resid: Function returning the residual array for an array of x.
+    x0, f0: Lower bracket and its residual.
+    x1, f1: Upper bracket and its residual.
+    done: Mask of elements to exclude from the search.
+    tol: Allowable absolute residual.
+    max_iters: Maximum number of search iterations to perform.
+    """
+    lo = x0
+    hi = x1
+    x = (lo + hi) * 0.5
+
+    for i in range(max_iters):
+        if done.all():
+            break
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = x1 - f1 * (x1 - x0) / (f1 - f0)
+
+        ok = np.isfinite(step) & (step > lo) & (step < hi)
+        x2 = np.where(ok, step, (lo + hi) * 0.5)
+        f2 = resid(x2)
+
+        # A NaN residual can not move the bracket, freeze those elements
+        #   at NaN instead of spending the remaining iterations on them
+        nan = f2 != f2
+        x = np.where(done, x, np.where(nan, np.nan, x2))
+        done = done | nan | (np.abs(f2) <= tol)
+        hi = np.where(f2 > 0.0, x2, hi)
+        lo = np.where(f2 < 0.0, x2, lo)
+        x0, f0, x1, f1 = x1, f1, x2, f2
+
+    return x
+
+@njit(cache=True)
+def _secant_scalar(ht_func, fixed, ht, by_age, x0, f0, x1, f1, tol, max_iters):
+    """
+    Scalar, jitted form of `_secant_search` for a jitted ht_func.
+
+    Searches age with site index fixed if by_age is True, otherwise site
+        index with age fixed.
+    """
+    lo = x0
+    hi = x1
+    x = (lo + hi) * 0.5
+
+    for i in range(max_iters):
+        step = np.nan
+        if f1 != f0:
+            step = x1 - f1 * (x1 - x0) / (f1 - f0)
+
+        if np.isfinite(step) and step > lo and step < hi:
+            x = step
+        else:
+            x = (lo + hi) * 0.5
+
+        if by_age:
+            f = ht_func(x, fixed) - ht
+        else:
+            f = ht_func(fixed, x) - ht
+
+        if f != f:
+            return np.nan
+
+        if abs(f) <= tol:
+            break
+
+        if f > 0.0:
+            hi = x
+        elif f < 0.0:
+            lo = x
+
+        x0, f0, x1, f1 = x1, f1, x, f
+
+    return x
+
+@njit(cache=True)
+def _njit_find_si(ht_func, bha, ht, min_si, max_si, max_iters, ht_err):
+    """
+    Scalar, jitted form of `find_si` for a jitted ht_func.
+    """
+    if not np.isfinite(ht) or ht <= 0.0:
+        return -np.inf
+
+    f0 = ht_func(bha, min_si) - ht
+    if f0 > 0.0:
+        return -np.inf
+
+    f1 = ht_func(bha, max_si) - ht
+    if f1 < 0.0:
+        return np.inf
+
+    return _secant_scalar(
+            ht_func, bha, ht, False, min_si, f0, max_si, f1, ht_err, max_iters)
+
+@njit(parallel=True, cache=True)
+def _njit_height_grid(ht_func, bha, si):
+    """
+    Return heights for each combination of 1-d bha and si, (n_bha, n_si).
+
+    Rows are evaluated in parallel with a scalar call of the jitted ht_func
+        per element.
+    """
+    ht = np.empty((bha.shape[0], si.shape[0]))
+    for i in prange(bha.shape[0]):
+        b = bha[i]
+        for j in range(si.shape[0]):
+            ht[i, j] = ht_func(b, si[j])
+
+    return ht
+
+@lru_cache(maxsize=4096)
+def _si_bounds(ht_func, bha, min_si, max_si):
+    """
+    Return the heights at min_si and max_si for a scalar bha.
+
+    NOTE: Only stateless height functions may be cached, see `find_si`.
+    """
+    return float(ht_func(bha, min_si)), float(ht_func(bha, max_si))
+
+@lru_cache(maxsize=256)
+def _bha_table(ht_func, si, min_bha, max_bha, step=0.5):
+    """
+    Return (bha, ht) arrays tabulating height with age for a scalar si.
+
+    The table is truncated at the first age where height stops increasing,
+        so it can be inverted with `np.interp`.
+
+    NOTE: Only stateless height functions may be cached, see `find_si`.
+    """
+    bha = np.arange(min_bha, max_bha + step, step, dtype=np.float64)
+    ht = np.asarray(ht_func(bha, si), dtype=np.float64)
+
+    with np.errstate(invalid='ignore'):
+        rising = np.diff(ht) > 0.0
+
+    n = len(ht) if rising.all() else np.argmin(rising) + 1
+    bha = bha[:n]
+    ht = ht[:n]
+    bha.flags.writeable = False
+    ht.flags.writeable = False
+
+    return bha, ht
+
 def find_si(
         ht_func, bha, ht, min_si=5.0, max_si=300.0
         , max_iters=20, ht_err=0.1):
@@ -43,44 +204,56 @@ def find_si(
     max_iters: Maximum number of search iterations to perform.
     ht_err: Allowable height tolerance.
 
+    NOTE: bha and ht may be arrays, in which case all pairs are searched
+        together and ht_func must accept array arguments.
+
     Return
     ------
     si: Estimated site index
     """
 
-    if (ht is None) or (not np.isfinite(ht)) or (ht<=0.0):
-        return -1 * np.Inf
+    if ht is None:
+        return -1 * np.inf
 
-    # First check the bounds of the search
-    min_ht = ht_func(bha, min_si)
-    if min_ht > ht:
-        return -1 * np.Inf
+    bha = np.asarray(bha, dtype=np.float64)
+    ht = np.asarray(ht, dtype=np.float64)
 
-    max_ht = ht_func(bha, max_si)
-    if max_ht < ht:
-        return np.Inf
+    def resid(si):
+        return ht_func(bha[()], si[()]) - ht
 
-    i = 0
-    while i < max_iters:
+    # Heights at the bounds of the search depend only on bha. They are cached
+    #   for scalar ages of plain (static) height functions, bound methods
+    #   may depend on curve state and are always evaluated. Arrays are
+    #   evaluated once per distinct age.
+    if bha.ndim == 0 and isinstance(ht_func, types.FunctionType):
+        lo_ht, hi_ht = _si_bounds(ht_func, float(bha), min_si, max_si)
 
-        mid_si = (min_si + max_si) * 0.5
-        mid_ht = ht_func(bha, mid_si)
+    elif bha.ndim > 0 and bha.size > 1:
+        ages, inv = np.unique(bha, return_inverse=True)
+        lo_ht = np.asarray(ht_func(ages, min_si))[inv].reshape(bha.shape)
+        hi_ht = np.asarray(ht_func(ages, max_si))[inv].reshape(bha.shape)
 
-        if mid_ht == np.NaN:
-            return np.NaN
+    else:
+        lo_ht = ht_func(bha[()], min_si)
+        hi_ht = ht_func(bha[()], max_si)
 
-        if abs(ht - mid_ht) <= ht_err:
-            break
-
-        if mid_ht > ht:
-            max_si = mid_si
+    # Bounds of the search, elements outside are flagged +/-inf
+    with np.errstate(invalid='ignore'):
+        lo_ht = lo_ht - ht
+        hi_ht = hi_ht - ht
+        too_low = ~np.isfinite(ht) | (ht <= 0.0) | (lo_ht > 0.0)
+        too_high = ~too_low & (hi_ht < 0.0)
 
-        elif mid_ht < ht:
-            min_si = mid_si
+    shape = too_low.shape
+    si = _secant_search(
+            resid
+            , np.full(shape, min_si, dtype=np.float64), lo_ht + np.zeros(shape)
+            , np.full(shape, max_si, dtype=np.float64), hi_ht + np.zeros(shape)
+            , too_low | too_high, ht_err, max_iters)
 
-        i += 1
+    si = np.where(too_low, -1 * np.inf, np.where(too_high, np.inf, si))
 
-    return mid_si
+    return si[()]
 
 def find_bha(
         ht_func, si, ht, ht_err=0.05, max_steps=50
@@ -98,50 +271,245 @@ def find_bha(
     ht_err: Height error tolerance.
     max_steps: Maximum number of search steps to attempt
 
+    NOTE: si and ht may be arrays, in which case all pairs are searched
+        together and ht_func must accept array arguments.
+
     Return
     ------
     bha: Estimated breast height age
-
-    Ref
-    ---
-    Adapted from:
-    http://interactivepython.org/runestone/static/pythonds/SortSearch/TheBinarySearch.html
     """
-    first = min_bha
-    last = max_bha
-
     # Make sure the search will terminate
     if ht_err <= 0.0:
         ht_err = 0.001
 
-    if ht <= min_ht:
-        logging.warn('*** Height is less than the curve minimum: {}<={}'.format(ht, min_ht))
-        return first
+    si = np.asarray(si, dtype=np.float64)
+    ht = np.asarray(ht, dtype=np.float64)
+
+    too_low = ht <= min_ht
+    if too_low.any():
+        logging.warn('*** Height is less than the curve minimum: {}<={}'.format(
+                ht[too_low].min(), min_ht))
 
     # Make sure the maximum height is not exceeded
-    if ht >= max_ht:
-        logging.warn('*** Height is greater than curve maximum: {}>={}'.format(ht, max_ht))
-        return last
-
-    # Start the search with a check_ht well above the maximum allowable
-    #   so the search does not get stuck
-    check_ht = ht + ht_err + 999
-    i = 0
-    # Stop searching when the tolerance met
-    # Stopping at max steps help guard against erroneous height functions
-    while (abs(check_ht - ht) > ht_err) and (i < max_steps):
-        # mid = round((first + last) / 2.0)
-        mid = (first + last) * 0.5
-        check_ht = ht_func(mid, si)
-        if ht < check_ht:
-            last = mid
-        else:
-            first = mid
+    too_high = ~too_low & (ht >= max_ht)
+    if too_high.any():
+        logging.warn('*** Height is greater than curve maximum: {}>={}'.format(
+                ht[too_high].max(), max_ht))
+
+    def resid(bha):
+        return ht_func(bha[()], si[()]) - ht
+
+    # The residuals at the bracket ends are left unknown, so the search
+    #   starts with bisection steps instead of two extra height calls
+    first = np.full(np.broadcast(si, ht).shape, min_bha, dtype=np.float64)
+    last = np.full(first.shape, max_bha, dtype=np.float64)
+    unknown = np.full(first.shape, np.nan)
+    with np.errstate(invalid='ignore'):
+        bha = _secant_search(
+                resid, first, unknown, last, unknown
+                , np.broadcast_to(too_low | too_high, first.shape)
+                , ht_err, max_steps)
+
+    bha = np.where(too_low, min_bha, np.where(too_high, max_bha, bha))
+
+    return bha[()]
+
+# Coefficients of the closed form site curves, kept as module constants so
+#   the jitted kernels below treat them as literals
+# King (1966) a0, a1, b0, b1, c0, c1, also used by misc_hg_funcs
+_KING_COEFS = (
+        -0.954038, 0.109757, 0.0558178, 0.00792236, -0.000733819, 0.000197693)
+# Wiley (1978) in the FIA PNW eq. 5a order, see misc_hg_funcs for FVS order
+_WILEY_FIA_COEFS = (0.1394, 0.0137, 0.00007, -1.7307, -0.0616, 0.00192)
+# Harrington (1986) height model, a, b, c, d, f
+_HARRINGTON_HT_COEFS = (59.5864, 0.7953, 0.001940, -0.0007403, 0.9198)
+_FARR_COEFS = (
+        -0.2050542, 1.449615, -0.01780992, 6.519748e-5, -1.095593e-23
+        , -5.611879, 2.418604, -0.2593110, 1.351445e-4, -1.701139e-12
+        , 7.964197e-27, -86.43)
+_CURTIS_COEFS = (0.6192, -5.3394, 240.29, 3368.9)
+
+# Arrays at least this large are evaluated with numexpr when it is installed,
+#   smaller arrays do not amortize its setup cost.
+_NUMEXPR_MIN_SIZE = 100000
+
+_KING_SITE_INDEX_EXPR = (
+        '4.5 + 2500 * ((a1 + bha * (b1 + c1 * bha))'
+        ' / (bha * bha / (ht - 4.5) - (a0 + bha * (b0 + c0 * bha))))')
+_WILEY_SITE_INDEX_EXPR = (
+        'where(bha * bha - (ht - 4.5) * (a1 + bha * (b1 + c1 * bha)) != 0'
+        ', 2500 * ((ht - 4.5) * (a0 + bha * (b0 + c0 * bha)))'
+        ' / (bha * bha - (ht - 4.5) * (a1 + bha * (b1 + c1 * bha))) + 4.5'
+        ', nan)')
+
+def _use_numexpr(*args):
+    """Return True if an expression over args should use numexpr."""
+    return numexpr is not None and np.broadcast(*args).size >= _NUMEXPR_MIN_SIZE
+
+def _numexpr_evaluate(expr, coefs, bha, ht):
+    """
+    Evaluate a site index expression of bha and ht in a single pass.
 
-        i += 1
+    Args
+    ----
+    expr: numexpr expression string
+    coefs: Coefficients, bound to a0, a1, b0, b1, c0, c1 in order.
+    """
+    names = dict(zip(('a0', 'a1', 'b0', 'b1', 'c0', 'c1'), coefs))
+    names.update(
+            bha=np.asarray(bha, dtype=np.float64)
+            , ht=np.asarray(ht, dtype=np.float64)
+            , nan=np.nan)
+
+    return numexpr.evaluate(expr, local_dict=names)
+
+@njit(cache=True, fastmath=True, error_model='numpy')
+def _king_height(bha, si):
+    a0, a1, b0, b1, c0, c1 = _KING_COEFS
+
+    z50 = 2500 / (si - 4.5)
+    a = a0 + a1 * z50
+    b = b0 + b1 * z50
+    c = c0 + c1 * z50
+
+    return (bha * bha) / (a + bha * (b + c * bha)) + 4.5
+
+# Memoized scalar heights of the stateless curves, repeated (bha, si) pairs
+#   skip the kernel dispatch. Only plain numbers are looked up.
+_king_height_cached = lru_cache(maxsize=4096)(_king_height)
+
+@njit(cache=True, fastmath=True, error_model='numpy')
+def _king_site_index(bha, ht):
+    a0, a1, b0, b1, c0, c1 = _KING_COEFS
+
+    i = bha * bha / (ht - 4.5)
+    j = i - (a0 + bha * (b0 + c0 * bha))
+    k = a1 + bha * (b1 + c1 * bha)
+
+    return 4.5 + 2500 * (k / j)
+
+@njit(cache=True, fastmath=True, error_model='numpy')
+def _wiley_height(bha, si):
+    a0, a1, a2, b0, b1, b2 = _WILEY_FIA_COEFS
+
+    z = 2500 / (si - 4.5)
+    i = a0 + bha * (a1 + a2 * bha)
+    j = b0 + bha * (b1 + b2 * bha)
+
+    return bha * bha / (z * i + j) + 4.5
+
+@njit(cache=True, fastmath=True, error_model='numpy')
+def _bruce_si_coeffs(si):
+    # Terms of Bruce (1981) that depend only on site index
+    ytb = 13.25 - si / 20
+    s = si / 100
+    b3 = -0.447762 + s * (-0.894427 + s * (0.793548 + s * -0.171666))
+
+    # NOTE: 63.25 - si / 20 == 50 + ytb, so z shares the index age term
+    base50 = (50 + ytb) ** b3
+    b2 = np.log(4.5 / si) / (ytb ** b3 - base50)
 
-#         logging.debug('** Search steps:', i)
-    return mid
+    return ytb, b3, b2, base50
+
+@njit(cache=True, fastmath=True, error_model='numpy')
+def _bruce_height_from_coeffs(bha, ytb, b3, b2, base50, si):
+    return si * np.exp(b2 * ((bha + ytb) ** b3 - base50))
+
+@njit(cache=True, fastmath=True, error_model='numpy')
+def _bruce_height(bha, si):
+    ytb, b3, b2, base50 = _bruce_si_coeffs(si)
+    return _bruce_height_from_coeffs(bha, ytb, b3, b2, base50, si)
+
+@njit(cache=True, fastmath=True, error_model='numpy')
+def _harrington_height(bha, si):
+    # Implement equation 4 with english units
+    a, b, c, d, f = _HARRINGTON_HT_COEFS
+
+    # NOTE: There is a typo and poor formatting in the publication
+    #       This was cross checked with the FVS PN source code (htcalc.f)
+    #       b -> d in second term, and f exponent on first eq chunk
+    x = (a + b * si) * (1.0 - np.exp((c + d * si) * bha)) ** f
+    y = (a + b * si) * (1.0 - np.exp((c + d * si) * 20.0)) ** f
+
+    return si + x - y
+
+_harrington_height_cached = lru_cache(maxsize=4096)(_harrington_height)
+
+@njit(cache=True, fastmath=True, error_model='numpy')
+def _farr_height(bha, si):
+    B0, B1, B2, B3, B4, B5, B6, B7, B8, B9, B10, B11 = _FARR_COEFS
+
+    # Evaluate log(bha) once, low order terms in Horner form
+    # NOTE: AZ and BZ are kept inline so Numba fuses a single loop
+    #       without allocating them as temporaries
+    lb = np.log(bha)
+
+    return (4.5
+            + np.exp(B0 + lb * (B1 + lb * lb * (B2 + B3 * lb * lb))
+                + B4 * lb ** 30)
+            + (B11 + si - 4.5)
+            * np.exp(B5 + lb * (B6 + lb * (B7 + B8 * lb * lb * lb))
+                + B9 * lb ** 16 + B10 * lb ** 36))
+
+@njit(cache=True, fastmath=True, error_model='numpy')
+def _curtis_height(bha, si):
+    b0, b1, b2, b3 = _CURTIS_COEFS
+
+    si45 = si - 4.5
+    p = bha ** (-1.4)
+
+    return si45 / (b0 + b1 / si45 + (b2 + b3 / si45) * p) + 4.5
+
+def _is_scalar(x):
+    """
+    Return True if x is a Python or NumPy number.
+    """
+    return isinstance(x, (int, float, np.number))
+
+def _kernel_arg(x):
+    """
+    Return x as a jitted kernel argument, a number or a float64 array.
+
+    Numba only types numbers and arrays, so sequences and pandas objects are
+        converted first.
+    """
+    if _is_scalar(x):
+        return x
+
+    return np.asarray(x, dtype=np.float64)
+
+def _like_args(result, *args):
+    """
+    Return an array result as a pandas object if an argument is one.
+
+    The result takes the index, and columns, of the first Series or DataFrame
+        argument of the same shape, other results are returned unchanged.
+    """
+    for x in args:
+        if (type(x).__module__.partition('.')[0] != 'pandas'
+                or np.shape(x) != np.shape(result)):
+            continue
+
+        import pandas as pd
+        if isinstance(x, pd.Series):
+            return pd.Series(result, index=x.index)
+
+        if isinstance(x, pd.DataFrame):
+            return pd.DataFrame(result, index=x.index, columns=x.columns)
+
+    return result
+
+def _call_kernel(kernel, x, y):
+    """
+    Return kernel(x, y) for a jitted kernel, keeping pandas arguments' index.
+    """
+    return _like_args(kernel(_kernel_arg(x), _kernel_arg(y)), x, y)
+
+def _is_int(*args):
+    """
+    Return True if all arguments are integer scalars.
+    """
+    return all(isinstance(a, (int, np.integer)) for a in args)
 
 # TODO: Make adjustments for total age when index_bha=False
 
@@ -154,6 +522,15 @@ class SiteCurve(object):
     """
     __metaclass__ = abc.ABCMeta
     __curve_name__ = 'none'
+    # Jitted height kernel used for scalar searches, see `_njit_find_si`
+    _njit_height = None
+    # True if `height` broadcasts over array arguments, otherwise the
+    #   vectorized methods fall back to calling it one element at a time
+    _height_is_vectorized = False
+
+    # True if height grids are faster from the parallel scalar loop of
+    #   `_njit_height_grid`, than from a single broadcast `height` call
+    _parallel_height_grid = False
     def __init__(self, name='', abbreviation=''
             , index_age=0, index_bha=True, min_bha=0, max_bha=250
             , min_si=10, max_si=250, si_incr=20, units='ft', *args, **kwargs):
@@ -168,8 +545,29 @@ class SiteCurve(object):
         self.si_incr = si_incr
         self.units = units
 
-        self.max_ht = self.height(self.max_bha, self.max_si)
-        self.min_ht = self.height(self.min_bha, self.min_si)
+        # Height lookup grid used by `find_si`, see `_height_grid`
+        self._ht_grid = None
+
+    @cached_property
+    def max_ht(self):
+        """
+        Height at the maximum age and site index, computed on first use.
+        """
+        return self.height(self.max_bha, self.max_si)
+
+    @cached_property
+    def min_ht(self):
+        """
+        Height at the minimum age and site index, computed on first use.
+        """
+        return self.height(self.min_bha, self.min_si)
+
+    @classmethod
+    def available(cls):
+        """
+        Return True if the libraries required by the site curve are installed.
+        """
+        return True
 
     @abc.abstractmethod
     def height(self, bha, si):
@@ -195,7 +593,10 @@ class SiteCurve(object):
         NOTE: If not implemented the `find_si` search function is used.
         """
         if hasattr(bha, '__iter__') or hasattr(ht, '__iter__'):
-            si = self.v_site_index(bha, ht)
+            if self._height_is_vectorized:
+                si = self.find_si(bha, ht)
+            else:
+                si = self.v_site_index(bha, ht)
         else:
             si = self.find_si(bha, ht)
 
@@ -205,6 +606,13 @@ class SiteCurve(object):
         """
         Return an array of heights.  Vectorized form of `self.height`.
         """
+        if self._height_is_vectorized:
+            # Arguments are not expanded to a common shape, so terms that
+            #   depend on a scalar site index are only evaluated once
+            bha = np.asarray(bha, dtype=np.float64)
+            si = np.asarray(si, dtype=np.float64)
+            return np.asarray(self.height(bha[()], si[()]))
+
         func = np.vectorize(self.height)
         ht = func(bha, si)
         return ht
@@ -213,17 +621,32 @@ class SiteCurve(object):
         """
         Return an array of site indexes. Vectorized form of `self.site_index`.
         """
+        if self._height_is_vectorized:
+            bha = np.asarray(bha, dtype=np.float64)
+            ht = np.asarray(ht, dtype=np.float64)
+            return np.asarray(self.site_index(bha[()], ht[()]))
+
         func = np.vectorize(self.site_index)
         si = func(bha, ht)
         return si
 
-    def height_table(self
+    def height_grid(self
                 , min_bha=None, max_bha=None, si_incr=20
-                , min_si=None, max_si=None):
-        """
-        Return a dataframe of age height pairs for a range of site index values.
+                , min_si=None, max_si=None, dtype=np.float64):
         """
+        Return heights for a range of ages and site index values.
 
+        Args
+        ----
+        dtype: Float type of the height array, np.float32 halves the
+                memory of large grids where full precision is not needed.
+
+        Return
+        ------
+        bha: Array of breast height ages
+        si: Array of site index values
+        ht: Height array with one row per age and one column per site index
+        """
         if min_bha is None: min_bha = self.min_bha
         if max_bha is None: max_bha = self.max_bha
         if min_si is None: min_si = self.min_si
@@ -232,18 +655,46 @@ class SiteCurve(object):
         bha = np.arange(min_bha, max_bha + 1, 2)
 
         if not hasattr(si_incr, '__iter__'):
-            si = np.round(np.arange(min_si, max_si + 1, si_incr))
+            si = np.arange(min_si, max_si + 1, si_incr)
+            # Integer ranges are already whole numbers
+            if not _is_int(min_si, max_si, si_incr):
+                si = np.round(si)
 
         else:
             si = si_incr
 
-        dfs = []
-        for s in si:
-            ht = self.v_height(bha, s)
-            d = pd.DataFrame({'bha':bha, 'si':s, 'ht':ht})
-            dfs.append(d)
+        si = np.asarray(si)
+
+        if self._parallel_height_grid and HAS_NUMBA:
+            ht = _njit_height_grid(self._njit_height
+                    , bha.astype(np.float64), si.astype(np.float64))
+
+        elif self._height_is_vectorized:
+            # Evaluate the whole grid at once
+            ht = np.asarray(self.height(
+                    bha.astype(dtype)[:, None], si.astype(dtype)[None, :]))
+
+        else:
+            ht = np.column_stack([self.v_height(bha, s) for s in si])
+
+        return bha, si, ht.astype(dtype, copy=False)
+
+    def height_table(self
+                , min_bha=None, max_bha=None, si_incr=20
+                , min_si=None, max_si=None, dtype=np.float64):
+        """
+        Return a dataframe of age height pairs for a range of site index values.
+        """
+        import pandas as pd
 
-        df = pd.concat(dfs)
+        bha, si, ht = self.height_grid(
+                min_bha, max_bha, si_incr, min_si, max_si, dtype=dtype)
+
+        # Rows ordered by site index
+        df = pd.DataFrame({
+                'bha':np.tile(bha, len(si))
+                , 'si':np.repeat(si, len(bha))
+                , 'ht':ht.T.ravel()})
 
         return df
 
@@ -254,6 +705,8 @@ class SiteCurve(object):
         """
         Return a dataframe of site index height pairs for a range of ages.
         """
+        import pandas as pd
+
         if min_bha is None: min_bha = self.min_bha
         if max_bha is None: max_bha = self.max_bha
         if min_ht is None: min_ht = self.min_ht
@@ -264,19 +717,40 @@ class SiteCurve(object):
         ht = np.arange(min_ht, max_ht + 1, 1)
 
         if not hasattr(bha_incr, '__iter__'):
-            bha = np.round(np.arange(min_bha, max_bha + 1, bha_incr)).astype(int)
+            bha = np.arange(min_bha, max_bha + 1, bha_incr)
+            # Integer ranges are already whole numbers
+            if not _is_int(min_bha, max_bha, bha_incr):
+                bha = np.round(bha).astype(int)
         else:
             bha = bha_incr
 
+        bha = np.asarray(bha)
+
+        if self._height_is_vectorized:
+            # Evaluate the whole grid at once, rows ordered by age
+            si = self.v_site_index(bha[:, None], ht[None, :])
+            si[si < min_si] = np.nan
+            si[si > max_si] = np.nan
+            df = pd.DataFrame({
+                    'bha':np.repeat(bha, len(ht))
+                    , 'ht':np.tile(ht, len(bha))
+                    , 'si':si.ravel()})
+
+            return df
+
         dfs = []
         for a in bha:
             si = self.v_site_index(a, ht)
             si[si < min_si] = np.nan
             si[si > max_si] = np.nan
-            d = pd.DataFrame({'bha':a, 'ht':ht, 'si':si})
+            d = pd.DataFrame({
+                    'bha':np.full(len(ht), a, dtype=bha.dtype)
+                    , 'ht':ht
+                    , 'si':np.asarray(si, dtype=np.float64)})
             dfs.append(d)
 
-        df = pd.concat(dfs)
+        # Matching column dtypes let concat join the frames block-wise
+        df = pd.concat(dfs, ignore_index=True, copy=False)
 
         return df
 
@@ -289,24 +763,175 @@ class SiteCurve(object):
         si: Site index
         ht: Total height
         """
+        if hasattr(si, '__iter__') or hasattr(ht, '__iter__'):
+            return self.v_find_bha(si, ht)
+
         return self.find_bha(si, ht)
 
     def find_bha(self, si, ht, ht_err=0.1, max_steps=50):
         """
         Return an estimate of breast height age for a site_index, height pair.
 
-        NOTE: BHA is found using a binary search method.
+        NOTE: BHA is found using a secant search safeguarded by bisection.
+            Arrays of heights for a single site index on curves with a
+            vectorized `height` are first interpolated from a cached table
+            of height by age, only estimates not within ht_err of ht are
+            searched.
         """
+        if (self._njit_height is not None and np.ndim(si) == 0
+                and np.ndim(ht) == 0 and self.min_ht < ht < self.max_ht):
+            # The residuals at the bracket ends are unknown, see `find_bha`
+            bha = _secant_scalar(self._njit_height, float(si), float(ht), True
+                    , float(self.min_bha), np.nan, float(self.max_bha), np.nan
+                    , max(ht_err, 0.001), max_steps)
+            return bha
+
+        if (self._height_is_vectorized and np.ndim(si) == 0 and np.ndim(ht) > 0
+                and isinstance(self.height, types.FunctionType)):
+            ages, hts = _bha_table(self.height, float(si)
+                    , float(self.min_bha), float(self.max_bha))
+
+            ht = np.asarray(ht, dtype=np.float64)
+            bha = np.interp(ht, hts, ages)
+            with np.errstate(invalid='ignore'):
+                found = ((ht > self.min_ht) & (ht < self.max_ht)
+                        & (np.abs(self.height(bha, float(si)) - ht) <= ht_err))
+
+            if not found.all():
+                bha[~found] = find_bha(self.height, si, ht[~found]
+                        , ht_err=ht_err, max_steps=max_steps
+                        , min_bha=self.min_bha, max_bha=self.max_bha
+                        , min_ht=self.min_ht, max_ht=self.max_ht)
+
+            return bha
+
         bha = find_bha(self.height, si, ht, ht_err=ht_err, max_steps=max_steps
                 , min_bha=self.min_bha, max_bha=self.max_bha
                 , min_ht=self.min_ht, max_ht=self.max_ht)
         return bha
 
-    def find_si(self, bha, ht, **kwargs):
-        si = find_si(self.height, bha, ht
-                , min_si=self.min_si, max_si=self.max_si)
+    def v_find_bha(self, si, ht, ht_err=0.1, max_steps=50):
+        """
+        Return an array of breast height ages. Vectorized form of `self.find_bha`.
+
+        NOTE: Curves with a vectorized `height` search all pairs together.
+        """
+        if not self._height_is_vectorized:
+            func = np.vectorize(
+                    lambda s, h: self.find_bha(s, h, ht_err, max_steps))
+            return func(si, ht)
 
-        return si
+        return self.find_bha(si, ht, ht_err=ht_err, max_steps=max_steps)
+
+    def find_si(self, bha, ht, ht_err=0.1, **kwargs):
+        """
+        Return an estimate of site index for a breast height age, height pair.
+
+        NOTE: Curves with a vectorized `height` interpolate the cached
+            `_height_grid`. Other curves, pairs outside of the grid, and
+            estimates not within ht_err of ht use the `find_si` search.
+            Scalar pairs on curves with a `_njit_height` are searched by
+            the jitted `_njit_find_si`.
+        """
+        if not self._height_is_vectorized:
+            si = find_si(self.height, bha, ht
+                    , min_si=self.min_si, max_si=self.max_si, ht_err=ht_err)
+
+            return si
+
+        if (self._njit_height is not None and ht is not None
+                and np.ndim(bha) == 0 and np.ndim(ht) == 0):
+            si = _njit_find_si(self._njit_height, float(bha), float(ht)
+                    , float(self.min_si), float(self.max_si), 20, ht_err)
+            return si
+
+        bha = np.asarray(bha, dtype=np.float64)
+        ht = np.asarray(ht, dtype=np.float64)
+        shape = np.broadcast(bha, ht).shape
+        bha = np.broadcast_to(bha, shape).flatten()
+        ht = np.broadcast_to(ht, shape).flatten()
+
+        si, found = self._grid_si(bha, ht)
+        with np.errstate(invalid='ignore'):
+            found &= np.abs(self.v_height(bha, si) - ht) <= ht_err
+
+        if not found.all():
+            si[~found] = find_si(self.height, bha[~found], ht[~found]
+                    , min_si=self.min_si, max_si=self.max_si, ht_err=ht_err)
+
+        return si.reshape(shape)[()]
+
+    def _height_grid(self, n_si=512):
+        """
+        Return the (bha, si, ht, monotonic) lookup grid, built on first use.
+
+        Heights are tabulated for each integer age between `min_bha` and
+            `max_bha` and for `n_si` site index values between `min_si` and
+            `max_si`. `monotonic` flags the ages where height strictly
+            increases with site index, only those rows can be searched.
+        """
+        if self._ht_grid is None:
+            bha = np.arange(self.min_bha, self.max_bha + 1, dtype=np.float64)
+            si = np.linspace(self.min_si, self.max_si, n_si)
+            with np.errstate(all='ignore'):
+                if self._parallel_height_grid and HAS_NUMBA:
+                    ht = _njit_height_grid(self._njit_height, bha, si)
+                else:
+                    ht = self.v_height(bha[:, None], si[None, :])
+                monotonic = (np.all(np.isfinite(ht), axis=1)
+                        & np.all(np.diff(ht, axis=1) > 0, axis=1))
+
+            self._ht_grid = (bha, si, ht, monotonic)
+
+        return self._ht_grid
+
+    def _grid_si(self, bha, ht):
+        """
+        Return site index interpolated from the height grid for 1-d bha, ht.
+
+        Heights are linearly interpolated between the bracketing grid ages,
+            each row is binary searched for ht, and site index is linearly
+            interpolated between the bracketing grid values.
+
+        Return
+        ------
+        si: Estimated site index, NaN where not found
+        found: Mask of the pairs found within the grid
+        """
+        bha_grid, si_grid, ht_grid, monotonic = self._height_grid()
+        n_bha = len(bha_grid)
+        n_si = len(si_grid)
+
+        x = bha - bha_grid[0]
+        x = np.where(np.isfinite(x), x, -1.0)
+        i = np.clip(np.floor(x), 0, n_bha - 2).astype(np.intp)
+        w = x - i
+
+        def row_ht(j):
+            return (1.0 - w) * ht_grid[i, j] + w * ht_grid[i + 1, j]
+
+        with np.errstate(invalid='ignore'):
+            found = ((x >= 0) & (x <= n_bha - 1)
+                    & monotonic[i] & monotonic[i + 1]
+                    & (ht >= row_ht(0)) & (ht <= row_ht(n_si - 1)))
+
+        # Binary search for the site index columns bracketing ht
+        lo = np.zeros(bha.shape, dtype=np.intp)
+        hi = np.full(bha.shape, n_si - 1, dtype=np.intp)
+        for k in range(int(np.ceil(np.log2(n_si - 1)))):
+            mid = (lo + hi) // 2
+            below = row_ht(mid) <= ht
+            lo = np.where(below, mid, lo)
+            hi = np.where(below, hi, mid)
+
+        h0 = row_ht(lo)
+        h1 = row_ht(hi)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            si = si_grid[lo] + (ht - h0) / (h1 - h0) * (si_grid[hi] - si_grid[lo])
+
+        si = np.where(found, si, np.nan)
+
+        return si, found
 
     def plot_height_growth(
             self, ax=None
@@ -333,21 +958,22 @@ class SiteCurve(object):
             else:
                 args[k] = locals()[k]
 
-        tbl = self.height_table(**args)
+        bha, si, hts = self.height_grid(dtype=np.float32, **args)
+        rates = np.diff(hts, axis=0) / np.diff(bha)[:, None]
+        age = bha[1:]
+
+        # Label each line at the last age of peak growth
+        peak = len(age) - 1 - np.argmax(rates[::-1], axis=0)
+        xlocs = age[peak]
+        ylocs = np.nanmax(rates, axis=0) + .02
 
         if ax == None:
+            from matplotlib import pyplot as plt
             fig, ax = plt.subplots()
 
-        for key, grp in tbl.groupby(['si']):
-            rate = grp - grp.shift()
-            ht = (rate['ht'].values / rate['bha'].values)[1:]
-            age = grp['bha'].values[1:]
-
-            xloc = age[np.where(ht == ht.max())[0]][-1]
-
+        for key, ht, xloc, yloc in zip(si, rates.T, xlocs, ylocs):
             p = ax.plot(age, ht, label=key, **kwargs)
-            ax.text(xloc, np.nanmax(ht) + .02
-                    , s=key, horizontalalignment='center')
+            ax.text(xloc, yloc, s=key, horizontalalignment='center')
 
 #         l = ax.legend(loc='best', title='Site Index')
         p = ax.set_title('Height Growth Rate\n{}'.format(self.name))
@@ -386,14 +1012,13 @@ class SiteCurve(object):
             else:
                 args[k] = locals()[k]
 
-        tbl = self.height_table(**args)
+        age, si, hts = self.height_grid(dtype=np.float32, **args)
 
         if ax == None:
+            from matplotlib import pyplot as plt
             fig, ax = plt.subplots()
 
-        for key, grp in tbl.groupby(['si']):
-            ht = grp['ht'].values
-            age = grp['bha'].values
+        for key, ht in zip(si, hts.T):
             xloc = args['max_bha'] - 3
 
             p = ax.plot(age, ht, label=key, **kwargs)
@@ -433,6 +1058,7 @@ class SiteCurve(object):
 #         print(tbl)
 
         if ax == None:
+            from matplotlib import pyplot as plt
             fig, ax = plt.subplots()
 
         pfx = 'Age='
@@ -441,7 +1067,7 @@ class SiteCurve(object):
             p = ax.plot(grp['ht'], grp['si'], label=key, **kwargs)
             i = np.nanargmax(grp['si'].values)
             y = round(np.nanmax(tbl['si'].values)) + 1
-            s = ax.text(grp['ht'][i], y, s='{}{}'.format(pfx, key)
+            s = ax.text(grp['ht'].iloc[i], y, s='{}{}'.format(pfx, key)
                     , horizontalalignment=ha)
             pfx = ''
             ha = 'center'
@@ -460,6 +1086,9 @@ class DF_King_SiteCurve(SiteCurve):
     Douglas-fir, King (1966)
     """
     __curve_name__ = 'king_1966'
+    _height_is_vectorized = True
+    _njit_height = staticmethod(_king_height)
+    _parallel_height_grid = True
     def __init__(self, *args, **kwargs):
         SiteCurve.__init__(self
                 , name='Douglas-fir, King (1966)'
@@ -483,22 +1112,10 @@ class DF_King_SiteCurve(SiteCurve):
         ----
         King (1966)
         """
+        if _is_scalar(bha) and _is_scalar(si):
+            return _king_height_cached(bha, si)
 
-        a0 = -0.954038
-        a1 = 0.109757
-        b0 = 0.0558178
-        b1 = 0.00792236
-        c0 = -0.000733819
-        c1 = 0.000197693
-
-        z50 = 2500 / (si - 4.5)
-        a = a0 + a1 * z50
-        b = b0 + b1 * z50
-        c = c0 + c1 * z50
-
-        ht = (bha * bha) / (a + b * bha + c * (bha * bha)) + 4.5
-
-        return ht
+        return _call_kernel(_king_height, bha, si)
 
     @staticmethod
     def site_index(bha, ht):
@@ -513,17 +1130,51 @@ class DF_King_SiteCurve(SiteCurve):
         bha - Breast Height Age
         ht - Total Height
         """
-        a0 = -0.954038
-        a1 = 0.109757
-        b0 = 0.0558178
-        b1 = 0.00792236
-        c0 = -0.000733819
-        c1 = 0.000197693
+        if _use_numexpr(bha, ht):
+            return _like_args(_numexpr_evaluate(
+                    _KING_SITE_INDEX_EXPR, _KING_COEFS, bha, ht), bha, ht)
 
-        i = bha ** 2 / (ht - 4.5)
-        j = i - a0 - b0 * bha - c0 * bha ** 2
-        k = a1 + b1 * bha + c1 * bha ** 2
-        si = 4.5 + 2500 * (k / j)
+        return _call_kernel(_king_site_index, bha, ht)
+
+    def find_si(self, bha, ht, ht_err=0.1, **kwargs):
+        """
+        Return an estimate of site index for a breast height age, height pair.
+
+        NOTE: King's height equation is inverted exactly by `site_index`, so
+            no search is needed. Only pairs where the inverse falls outside
+            of min_si, max_si or is not within ht_err of ht, are passed
+            to `SiteCurve.find_si`, e.g. to flag heights beyond the curves.
+        """
+        if ht is None:
+            return super(DF_King_SiteCurve, self).find_si(bha, ht, ht_err, **kwargs)
+
+        if np.ndim(bha) == 0 and np.ndim(ht) == 0:
+            try:
+                si = _king_site_index(float(bha), float(ht))
+                if (self.min_si <= si <= self.max_si
+                        and abs(_king_height(float(bha), si) - ht) <= ht_err):
+                    return si
+
+            except ZeroDivisionError:
+                # Only raised by the pure Python kernels, e.g. at ht=4.5
+                pass
+
+            return super(DF_King_SiteCurve, self).find_si(bha, ht, ht_err, **kwargs)
+
+        bha = np.asarray(bha, dtype=np.float64)
+        ht = np.asarray(ht, dtype=np.float64)
+        with np.errstate(all='ignore'):
+            si = np.asarray(_king_site_index(bha[()], ht[()]), dtype=np.float64)
+            found = ((si >= self.min_si) & (si <= self.max_si)
+                    & (np.abs(_king_height(bha[()], si[()]) - ht) <= ht_err))
+
+        if found.all():
+            return si[()]
+
+        miss = ~found
+        si[miss] = super(DF_King_SiteCurve, self).find_si(
+                np.broadcast_to(bha, si.shape)[miss]
+                , np.broadcast_to(ht, si.shape)[miss], ht_err, **kwargs)
 
         return si
 
@@ -541,6 +1192,9 @@ class WH_Wiley_SiteCurve(SiteCurve):
     Western Hemlock, FIA PNW eq. 5a, Wiley (1978)
     """
     __curve_name__ = 'wiley_1978'
+    _height_is_vectorized = True
+    _njit_height = staticmethod(_wiley_height)
+    _parallel_height_grid = True
     def __init__(self, *args, **kwargs):
         SiteCurve.__init__(self
                 , name='Western Hemlock, Wiley (1978)'
@@ -555,50 +1209,41 @@ class WH_Wiley_SiteCurve(SiteCurve):
         """
         FIA PNW eq. 5a, Wiley (1978), solved for height
         """
-        a0 = 0.1394
-        a1 = 0.0137
-        a2 = 0.00007
-        b0 = -1.7307
-        b1 = -0.0616
-        b2 = 0.00192
-
-        z = 2500 / (si - 4.5)
-        i = a0 + a1 * bha + a2 * bha ** 2
-        j = b0 + b1 * bha + b2 * bha ** 2
-        h = bha ** 2 / (z * i + j) + 4.5
-
-        return h
+        return _call_kernel(_wiley_height, bha, si)
 
     @staticmethod
     def site_index(bha, ht):
         """
         FIA PNW eq. 5a, Wiley (1978)
         """
-        a0 = 0.1394
-        b0 = 0.0137
-        c0 = 0.00007
-        a1 = -1.7307
-        b1 = -0.0616
-        c1 = 0.00192
+        if _use_numexpr(bha, ht):
+            a0, b0, c0, a1, b1, c1 = _WILEY_FIA_COEFS
+            return _like_args(_numexpr_evaluate(_WILEY_SITE_INDEX_EXPR
+                    , (a0, a1, b0, b1, c0, c1), bha, ht), bha, ht)
 
-        x = a0 + b0 * bha + c0 * bha ** 2.0
-        y = a1 + b1 * bha + c1 * bha ** 2.0
+        a0, b0, c0, a1, b1, c1 = _WILEY_FIA_COEFS
 
-        try:
-            si = 2500 * (
-                    ((ht - 4.5) * x) / (bha ** 2.0 - (ht - 4.5) * y)
-                    ) + 4.5
-        except:
-            logging.error('Error computing site index: bha:{}, ht:{}'.format(bha, ht))
-            si = np.NaN
+        args = (bha, ht)
+        bha = np.asarray(bha, dtype=np.float64)
+        ht = np.asarray(ht, dtype=np.float64)
 
-        return si
+        x = a0 + bha * (b0 + c0 * bha)
+        y = a1 + bha * (b1 + c1 * bha)
+
+        # Undefined where the denominator vanishes, e.g. bha=0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denom = bha * bha - (ht - 4.5) * y
+            si = np.where(denom != 0, 2500 * ((ht - 4.5) * x) / denom + 4.5, np.nan)
+
+        return _like_args(si[()], *args)
 
 class DF_Bruce_SiteCurve(SiteCurve):
     """
     Douglas-fir, Bruce (1981)
     """
     __curve_name__ = 'bruce_1981'
+    _height_is_vectorized = True
+    _njit_height = staticmethod(_bruce_height)
     def __init__(self, *args, **kwargs):
         SiteCurve.__init__(self
                 , name='Douglas-fir, Bruce (1981)'
@@ -613,18 +1258,7 @@ class DF_Bruce_SiteCurve(SiteCurve):
         """
         Bruce (1981)
         """
-        ytb = 13.25 - si / 20
-        b3 = (-0.447762 - 0.894427 * (si / 100)
-                + 0.793548 * (si / 100) ** 2.0
-                - 0.171666 * (si / 100) ** 3.0
-                )
-
-        z = ((13.25 - si / 20) ** b3 - (63.25 - si / 20) ** b3)
-        b2 = np.log(4.5 / si) / z
-
-        ht = si * np.exp(b2 * ((bha + ytb) ** b3 - (50 + ytb) ** b3))
-
-        return ht
+        return _call_kernel(_bruce_height, bha, si)
 
     def plot_site_index_curves(self, ax=None
             , min_bha=20, max_bha=120, bha_incr=10
@@ -639,6 +1273,8 @@ class RA_Harrington_SiteCurve(SiteCurve):
     Red alder, Harrington (1986)
     """
     __curve_name__ = 'harrington_1986'
+    _height_is_vectorized = True
+    _njit_height = staticmethod(_harrington_height)
     def __init__(self, *args, **kwargs):
         SiteCurve.__init__(self
                 , name='Red alder, Harrington (1986)'
@@ -677,44 +1313,37 @@ class RA_Harrington_SiteCurve(SiteCurve):
                 correct for predicting SI than simply solving the height
                 growth function for SI.
         """
-        if bha <= 0:
-            return 0.0
+        bha = np.asarray(bha, dtype=np.float64)
+        ht = np.asarray(ht, dtype=np.float64)
 
-        a = 54.1857 - 4.6170 * bha + 0.11065 * bha ** 2 - 0.00076335 * bha ** 3
-        b = 1.25934 - 0.012989 * bha + 3.5220 * (1.0 / bha) ** 3
+        # Zero for ages <= 0, selected without branching so arrays work
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv = 1.0 / bha
+            a = 54.1857 + bha * (-4.6170 + bha * (0.11065 + bha * -0.00076335))
+            b = 1.25934 - 0.012989 * bha + 3.5220 * (inv * inv * inv)
 
-        si = a + b * ht
+            si = np.where(bha > 0, a + b * ht, 0.0)
 
-        return si
+        return si[()]
 
     @staticmethod
     def height(bha, si):
         """
         Harrington (1986)
         """
+        if _is_scalar(bha) and _is_scalar(si):
+            return _harrington_height_cached(bha, si)
 
-        # Implement equation 4 with english units
-        a = 59.5864
-        b = 0.7953
-        c = 0.001940
-        d = -0.0007403
-        f = 0.9198
-
-        # NOTE: There is a typo and poor formatting in the publication
-        #       This was cross checked with the FVS PN source code (htcalc.f)
-        #       b -> d in second term, and f exponent on first eq chunk
-        x = (a + b * si) * (1.0 - np.exp((c + d * si) * bha)) ** f
-        y = (a + b * si) * (1.0 - np.exp((c + d * si) * 20.0)) ** f
-
-        ht = si + x - y
-
-        return ht
+        return _call_kernel(_harrington_height, bha, si)
 
 class SS_Farr_SiteCurve(SiteCurve):
     """
     Sitka spruce, Farr (1984), Res. Paper PNW-326
     """
     __curve_name__ = 'farr_1984'
+    _height_is_vectorized = True
+    _njit_height = staticmethod(_farr_height)
+    _parallel_height_grid = True
     def __init__(self, *args, **kwargs):
         SiteCurve.__init__(self
                 , name='Sitka Spruce, Farr (1984)'
@@ -734,34 +1363,16 @@ class SS_Farr_SiteCurve(SiteCurve):
 
         NOTE: Adapted from FVS PN variant `htcalc.f`
         """
-        B0 = -0.2050542
-        B1 = 1.449615
-        B2 = -0.01780992
-        B3 = 6.519748e-5
-        B4 = -1.095593e-23
-        B5 = -5.611879
-        B6 = 2.418604
-        B7 = -0.2593110
-        B8 = 1.351445e-4
-        B9 = -1.701139e-12
-        B10 = 7.964197e-27
-        B11 = -86.43
-
-        AZ = (B0 + B1 * np.log(bha)
-                + B2 * np.log(bha) ** 3.0
-                + B3 * np.log(bha) ** 5.0
-                + B4 * np.log(bha) ** 30.0)
-        BZ = (B5 + B6 * np.log(bha) + B7 * np.log(bha) ** 2.0 + B8 * np.log(bha) ** 5.0
-                + B9 * np.log(bha) ** 16.0 + B10 * np.log(bha) ** 36.0)
-        ht = 4.5 + np.exp(AZ) + B11 * np.exp(BZ) + (si - 4.5) * np.exp(BZ)
-
-        return ht
+        return _call_kernel(_farr_height, bha, si)
 
 class DF_Curtis_SiteCurve(SiteCurve):
     """
     Douglas-fir, Curtis, 1972
     """
     __curve_name__ = 'curtis_1974'
+    _height_is_vectorized = True
+    _njit_height = staticmethod(_curtis_height)
+    _parallel_height_grid = True
     def __init__(self, *args, **kwargs):
         SiteCurve.__init__(self
                 , name='Douglas-fir, Curtis (1974)'
@@ -780,18 +1391,7 @@ class DF_Curtis_SiteCurve(SiteCurve):
 
         NOTE: Adapted from FVS (PN, WC) source code `htcalc.f`.
         """
-
-        b0 = 0.6192
-        b1 = -5.3394
-        b2 = 240.29
-        b3 = 3368.9
-
-        ht = (
-                (si - 4.5) / (b0 + b1 / (si - 4.5)
-                + b2 * bha ** (-1.4) + (b3 / (si - 4.5)) * bha ** (-1.4))
-                ) + 4.5
-
-        return ht
+        return _call_kernel(_curtis_height, bha, si)
 
 class DF_SMC_SiteCurve(SiteCurve):
     """
@@ -813,6 +1413,11 @@ class DF_SMC_SiteCurve(SiteCurve):
     """
 
     __curve_name__ = 'smc_2001'
+
+    # Configuration currently loaded in the dfsite library, which holds a
+    #   single global state shared by all instances
+    _dfsite_config = None
+
     def __init__(self, *args, **kwargs):
         #max_age=100, units='ft', convergence=0.5 / 12.0, ht_plant=1.4
         self.max_age = kwargs.get('max_age', 100)
@@ -835,6 +1440,10 @@ class DF_SMC_SiteCurve(SiteCurve):
 
         self.setup()
 
+    @classmethod
+    def available(cls):
+        return 'smc_dfsite' in sys.modules
+
     def setup(self):
         """
         Initialize the dfsite library
@@ -848,6 +1457,11 @@ class DF_SMC_SiteCurve(SiteCurve):
 
         # Base curves assume a density of 300 TPA
         self.set_density(2, 100, 300)
+        DF_SMC_SiteCurve._dfsite_config = self._config()
+
+    def _config(self):
+        """Return the dfsite configuration loaded by `setup`."""
+        return (self.max_age, self._units, self.convergence, self.ht_plant)
 
     def set_density(self, age1, age2, density):
         """
@@ -856,6 +1470,8 @@ class DF_SMC_SiteCurve(SiteCurve):
         # Base curves assume a density of 300 TPA
         dense = np.zeros((100), dtype=np.float32)
         dense[age1:age2] = density
+        # The base density regime is no longer loaded
+        DF_SMC_SiteCurve._dfsite_config = None
         err = smc_dfsite.dfsite3d(age1, age2, dense)
         if err != 0:
             raise ValueError('Error setting density regime.')
@@ -869,7 +1485,11 @@ class DF_SMC_SiteCurve(SiteCurve):
         tta - Tree age (from seed).
         si - Site index.
         """
-        self.setup()
+        # Reinitialize only if the library was configured by another curve
+        #   or with another density regime
+        if DF_SMC_SiteCurve._dfsite_config != self._config():
+            self.setup()
+
         psi, si, err = smc_dfsite.dfsite3h(si, 1, self.index_age)
         ht_base, ht_adj = smc_dfsite.dfsite4(tta)
         return ht_base
@@ -882,10 +1502,19 @@ class DF_SMC_SiteCurve(SiteCurve):
         ----
         tta: Tree age (from seed)
         """
-        self.setup()
+        if DF_SMC_SiteCurve._dfsite_config != self._config():
+            self.setup()
+
         psi, si, err = smc_dfsite.dfsite3h(ht, 1, tta)
         return si
 
+# Number of arguments to the htcalc routine of each FVS variant, variants
+#   with 4 also take the forest location index
+_FVS_HTCALC_ARITY = {
+        'PN': 3, 'WC': 3, 'OP': 3
+        , 'SO': 4, 'CA': 4, 'OC': 4
+        }
+
 class FVS_SiteCurve(SiteCurve):
     """
     Species site curves embedded in FVS variant libraries.
@@ -895,6 +1524,9 @@ class FVS_SiteCurve(SiteCurve):
     def __init__(self, fvs_variant, spp, forest_code=0, *args, **kwargs):
         self.fvs_variant = fvs_variant.upper()
         self.spp = spp.upper()
+        self._name = 'FVS-{} Height Curve (sp={})'.format(
+                self.fvs_variant, self.spp)
+        self._abbreviation = 'FVS {} ({})'.format(self.fvs_variant, self.spp)
         ## TODO: Get default forest code from FVS
         self.forest_code = forest_code
 
@@ -962,17 +1594,36 @@ class FVS_SiteCurve(SiteCurve):
                 , units='ft'
                 , **kwargs)
 
+    @classmethod
+    def available(cls):
+        return 'pyfvs.fvs' in sys.modules
+
     def _setup(self):
         self.fvs = pyfvs.fvs.FVS(self.fvs_variant)
         self.fvs.fvs_step.init_blkdata()
+        self._forest_idx = None
 
-        if not self.spp in list(self.fvs.spp_codes):
+        # Materialize the species codes from the FVS library only once
+        codes = tuple(self.fvs.spp_codes)
+        if self.spp not in codes:
             msg = (f'Species code {self.spp} is not recognized.  '
-                f'Expected one of {list(self.fvs.spp_codes)}'
+                f'Expected one of {codes}'
                 )
             raise ValueError(msg)
 
-        self.spp_idx = list(self.fvs.spp_codes).index(self.spp) + 1
+        self.spp_idx = codes.index(self.spp) + 1
+
+        # Bind the htcalc call signature of the variant once
+        arity = _FVS_HTCALC_ARITY.get(self.fvs_variant)
+        if arity is None:
+            logging.warn('Height not fully implemented for variant: {}'.format(
+                    self.fvs_variant))
+            arity = 3
+
+        if arity == 4:
+            self._htcalc_impl = self._htcalc_forest_species
+        else:
+            self._htcalc_impl = self._htcalc_species
 
         # try:
             # if not self.spp in list(self.fvs.spp_codes):
@@ -1007,19 +1658,31 @@ class FVS_SiteCurve(SiteCurve):
 #                 , 20:('RA',)
 #                 }}
 
+    @property
+    def forest_code(self):
+        """FVS forest location code."""
+        return self._forest_code
+
+    @forest_code.setter
+    def forest_code(self, value):
+        self._forest_code = value
+        # The forest index is resolved lazily for the new code
+        self._forest_idx = None
+
     @property
     def forest_idx(self):
         """Index of the FVS forest location code."""
-        self.fvs.globals.kodfor = [self.forest_code, ]
-        self.fvs.forkod()
-        return self.fvs.globals.ifor
+        if self._forest_idx is None:
+            self.fvs.globals.kodfor = [self.forest_code, ]
+            self.fvs.forkod()
+            self._forest_idx = self.fvs.globals.ifor
+
+        return self._forest_idx
 
     @property
     def name(self):
         # TODO: Interogate the FVS library for references???
-        s = 'FVS-{} Height Curve (sp={})'.format(
-                self.fvs_variant, self.spp)
-        return s
+        return self._name
 
     @name.setter
     def name(self, value):
@@ -1027,30 +1690,23 @@ class FVS_SiteCurve(SiteCurve):
 
     @property
     def abbreviation(self):
-        s = 'FVS {} ({})'.format(self.fvs_variant, self.spp)
-        return s
+        return self._abbreviation
 
     @abbreviation.setter
     def abbreviation(self, value):
         pass
 
+    def _htcalc_species(self, bha, si):
+        return self.fvs.htcalc(si, self.spp_idx, bha)
+
+    def _htcalc_forest_species(self, bha, si):
+        return self.fvs.htcalc(self.forest_idx, si, self.spp_idx, bha)
+
     def height(self, bha, si):
         """
-
+        Return height from the variant htcalc routine bound in `_setup`.
         """
-
-        if self.fvs_variant in ('PN', 'WC', 'OP'):
-            ht = self.fvs.htcalc(si, self.spp_idx, bha)
-
-        elif self.fvs_variant in ('SO', 'CA', 'OC'):
-            ht = self.fvs.htcalc(self.forest_idx, si, self.spp_idx, bha)
-
-        else:
-            logging.warn('Height not fully implemented for variant: {}'.format(
-                    self.fvs_variant))
-            ht = self.fvs.htcalc(si, self.spp_idx, bha)
-
-        return ht
+        return self._htcalc_impl(bha, si)
 
 # def test():
 #     si = WH_SiteCurve()
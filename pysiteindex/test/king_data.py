@@ -1,5 +1,9 @@
 # Height values extracted from King 1966
-si = [[
+#   The first row of each table holds the site index of each column, the
+#   first column holds breast height age.
+import numpy as np
+
+tables = [[
         ['bha',50,52,54,56,58,60,62,64,66,68,70,72,74]
         ,[5,8.8,9,9.1,9.3,9.4,9.6,9.8,9.9,10.1,10.2,10.4,10.6,10.7]
         ,[6,9.7,9.9,10.1,10.3,10.5,10.7,10.9,11.2,11.4,11.6,11.8,12,12.2]
@@ -127,4 +131,20 @@ si = [[
         ,[92,160.4,163.3,166.2,169.1,172,174.9,177.9,180.8,183.7,186.6]
         ,[93,161.2,164,167,169.9,172.9,175.8,178.8,181.7,184.6,187.5]
         ,[94,161.9,164.8,167.7,170.7,173.7,176.6,179.6,182.5,185.5,188.4]
-    ]]
\ No newline at end of file
+    ]]
+
+def _flatten(tables):
+    """
+    Return flat (bha, si, ht) arrays with one element per table cell.
+    """
+    bha, si, ht = [], [], []
+    for t in tables:
+        cols = np.array(t[0][1:], dtype=np.float64)
+        data = np.array(t[1:], dtype=np.float64)
+        bha.append(np.repeat(data[:, 0], len(cols)))
+        si.append(np.tile(cols, len(data)))
+        ht.append(data[:, 1:].ravel())
+
+    return np.concatenate(bha), np.concatenate(si), np.concatenate(ht)
+
+bha, si, ht = _flatten(tables)
@@ -0,0 +1,90 @@
+import io
+import unittest
+
+import pandas as pd
+import numpy as np
+from click.testing import CliRunner
+
+import site_index
+import site_index.si
+from site_index.__main__ import cli
+
+
+class Test_Batch(unittest.TestCase):
+    """
+    Test the si and ht command --batch options.
+    """
+
+    curve = 'king_1966'
+
+    def run_batch(self, command, df):
+        """
+        Return the result of a command run on df written to a batch file.
+        """
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            df.to_csv('trees.csv', index=False)
+            result = runner.invoke(cli
+                    , [command, '-c', self.curve, '--batch', 'trees.csv'])
+
+        return result
+
+    def test_si_batch(self):
+        """
+        Site index is appended and the other columns are passed through.
+        """
+        df = pd.DataFrame({'plot': [1, 1, 2], 'tree': [3, 4, 5]
+                , 'age': [15.0, 50.0, 75.0], 'height': [37.3, 100.0, 125.1]})
+        result = self.run_batch('si', df)
+        assert result.exit_code == 0, result.output
+
+        out = pd.read_csv(io.StringIO(result.output))
+        assert list(out.columns) == ['plot', 'tree', 'age', 'height', 'site_index']
+        pd.testing.assert_frame_equal(out[df.columns], df)
+
+        sc = site_index.si.DF_King_SiteCurve()
+        np.testing.assert_allclose(out['site_index']
+                , sc.v_site_index(df['age'].values, df['height'].values), atol=1e-6)
+
+    def test_ht_batch(self):
+        """
+        Height is appended and the other columns are passed through.
+        """
+        df = pd.DataFrame({'tree': ['a', 'b', 'c']
+                , 'age': [15.0, 50.0, 75.0], 'site_index': [100.0, 100.0, 100.0]})
+        result = self.run_batch('ht', df)
+        assert result.exit_code == 0, result.output
+
+        out = pd.read_csv(io.StringIO(result.output))
+        assert list(out.columns) == ['tree', 'age', 'site_index', 'height']
+        pd.testing.assert_frame_equal(out[df.columns], df)
+        np.testing.assert_allclose(out['height'], [37.3, 100.0, 125.1], atol=0.1)
+
+    def test_missing_column(self):
+        """
+        Batch files without the required columns are a usage error.
+        """
+        df = pd.DataFrame({'age': [15.0, 50.0], 'ht': [37.3, 100.0]})
+        result = self.run_batch('si', df)
+        assert result.exit_code == 2
+        assert 'missing column(s): height' in result.output
+
+        result = self.run_batch('ht', df)
+        assert result.exit_code == 2
+        assert 'missing column(s): site_index' in result.output
+
+    def test_missing_option(self):
+        """
+        Single tree estimates without --batch require the tree options.
+        """
+        runner = CliRunner()
+        result = runner.invoke(cli, ['si', '-c', self.curve, '-a', '50'])
+        assert result.exit_code == 2
+        assert '--age and --height are required' in result.output
+
+        result = runner.invoke(cli, ['ht', '-c', self.curve, '-a', '50'])
+        assert result.exit_code == 2
+        assert '--age and --site-index are required' in result.output
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,12 +4,14 @@ Created on Dec 5, 2016
 @author: THAREN
 '''
 import unittest
+from unittest import mock
 
 import pandas as pd
 import numpy as np
 
 import site_index
 import site_index.si
+import site_index._jit
 
 
 class Test_DF_King(unittest.TestCase):
@@ -17,17 +19,14 @@ class Test_DF_King(unittest.TestCase):
     Test the King (1966) Douglas-fir SiteCurve subclass functions.
     """
     
-    # test data
-    si = pd.Series([70,100,130])
-    bha = pd.Series([15,50,75,120])
-    ht = pd.DataFrame.from_records([
+    # test data, ht has one row per si and one column per bha
+    si = np.array([70,100,130], dtype=np.float64)
+    bha = np.array([15,50,75,120], dtype=np.float64)
+    ht = np.array([
         [26.7,70.0,86.7,104.3],
         [37.3,100.0,125.1,152.2],
         [48.1,130.0,163.9,201.7]
         ])
-    ht.index = si
-    ht.index.name = 'si'
-    ht.columns = bha
     
     def test_height(self):
         """
@@ -35,11 +34,13 @@ class Test_DF_King(unittest.TestCase):
         """
         df_king = site_index.si.DF_King_SiteCurve()
         
-        for a in self.bha:
-            for i in self.si:
-                ht = self.ht.loc[i,a]
-                hx = df_king.height(a, i)
-                assert abs(hx-ht)<0.1
+        bha, si = np.meshgrid(self.bha, self.si)
+        hx = df_king.v_height(bha.ravel(), si.ravel())
+        np.testing.assert_allclose(hx, self.ht.ravel(), rtol=0, atol=0.1)
+
+        # Scalar arguments use the cached kernel
+        hs = [df_king.height(a, i) for a, i in zip(bha.ravel(), si.ravel())]
+        np.testing.assert_allclose(hs, self.ht.ravel(), rtol=0, atol=0.1)
 
     def test_site_index(self):
         """
@@ -47,12 +48,27 @@ class Test_DF_King(unittest.TestCase):
         """
         df_king = site_index.si.DF_King_SiteCurve()
         
-        for a in self.bha:
-            for i in self.si:
-                ht = self.ht.loc[i,a]
-                sx = df_king.site_index(a, ht)
-                assert abs(i-sx)<0.1
+        bha, si = np.meshgrid(self.bha, self.si)
+        sx = df_king.v_site_index(bha.ravel(), self.ht.ravel())
+        np.testing.assert_allclose(sx, si.ravel(), rtol=0, atol=0.1)
                 
+    def test_sequence_args(self):
+        """
+        Test the King (1966) DF functions with pandas and list arguments.
+        """
+        df_king = site_index.si.DF_King_SiteCurve()
+        
+        bha, si = np.meshgrid(self.bha, self.si)
+        ht = self.ht.ravel()
+        for b, s, h in (
+                (pd.Series(bha.ravel()), pd.Series(si.ravel()), pd.Series(ht))
+                , (list(bha.ravel()), list(si.ravel()), list(ht))):
+            np.testing.assert_allclose(df_king.height(b, s), ht, rtol=0, atol=0.1)
+            np.testing.assert_allclose(df_king.site_index(b, h), si.ravel()
+                    , rtol=0, atol=0.1)
+            np.testing.assert_allclose(df_king.find_si(b, h), si.ravel()
+                    , rtol=0, atol=0.1)
+        
     def test_find_si(self):
         """
         Test the King (1966) DF site index search function.
@@ -60,9 +76,9 @@ class Test_DF_King(unittest.TestCase):
         df_king = site_index.si.DF_King_SiteCurve()
         
         errs = []
-        for a in self.bha:
-            for i in self.si:
-                ht = self.ht.loc[i,a]
+        for j, a in enumerate(self.bha):
+            for k, i in enumerate(self.si):
+                ht = self.ht[k, j]
                 sx = df_king.find_si(a, ht)
                 
                 # Test for equivalence within 1.0%
@@ -83,9 +99,9 @@ class Test_DF_King(unittest.TestCase):
         df_king = site_index.si.DF_King_SiteCurve()
         
         errs = []
-        for a in self.bha:
-            for i in self.si:
-                ht = self.ht.loc[i,a]
+        for j, a in enumerate(self.bha):
+            for k, i in enumerate(self.si):
+                ht = self.ht[k, j]
                 ax = df_king.find_bha(i, ht)
                 
                 # Verify BHA rounds the same
@@ -97,7 +113,48 @@ class Test_DF_King(unittest.TestCase):
             df = pd.DataFrame.from_records(errs)
             df.columns = ['SI','Ht','BHA','BHA_est']
             print(df)
-            raise AssertionError('BHA search errors') 
+            raise AssertionError('BHA search errors')
+
+    def test_find_bha_table(self):
+        """
+        Test the King (1966) DF age search for one site index and many heights.
+        """
+        df_king = site_index.si.DF_King_SiteCurve()
+        si = 100.0
+
+        # Below the curve, in range, above the table but below max_ht, and
+        #   above the curve
+        ht = np.array([df_king.min_ht - 1.0, 40.0, 100.0, 150.0
+                , df_king.height(df_king.max_bha, si) + 1.0, df_king.max_ht + 1.0])
+
+        site_index.si._bha_table.cache_clear()
+        bx = df_king.find_bha(si, ht)
+        assert site_index.si._bha_table.cache_info().currsize == 1
+
+        sx = site_index.si.find_bha(df_king.height, si, ht
+                , min_bha=df_king.min_bha, max_bha=df_king.max_bha
+                , min_ht=df_king.min_ht, max_ht=df_king.max_ht)
+        np.testing.assert_allclose(bx, sx, rtol=0, atol=0.1)
+
+        assert bx[0] == df_king.min_bha
+        np.testing.assert_allclose(bx[-2:], df_king.max_bha, rtol=0, atol=1e-6)
+        hx = df_king.v_height(bx[1:4], si)
+        np.testing.assert_allclose(hx, ht[1:4], rtol=0, atol=0.1)
+
+    def test_age_array(self):
+        """
+        Test the King (1966) DF age search with array arguments.
+        """
+        df_king = site_index.si.DF_King_SiteCurve()
+
+        bha, si = np.meshgrid(self.bha, self.si)
+        ht = self.ht
+        ax = df_king.age(si, ht)
+        assert ax.shape == ht.shape
+        assert np.all(np.abs(ax-bha)<=0.5)
+
+        for i, h, a in zip(si.ravel(), ht.ravel(), ax.ravel()):
+            assert abs(df_king.find_bha(i, h) - a) < 1e-6
 
     def test_validate(self):
         """
@@ -105,35 +162,20 @@ class Test_DF_King(unittest.TestCase):
         """
         from site_index.test import king_data
         df_king = site_index.si.DF_King_SiteCurve()
-        ht_func = df_king.v_height
         
         # Tables of data reported in the original publication by King, 1966.
-        king_si = king_data.si
-        
-        si_dfs = []
-        for s in king_si:
-            l = len(s[0])
-            cols = s[0]
-            # Load the data records to a dataframe
-            data = np.array([s[i] for i in range(1,len(s))])
-            df = pd.DataFrame.from_records(data)
-            df.columns = cols
-            df.set_index('bha',inplace=True)
-            df = df.stack().reset_index()
-            df.columns = ('bha','si','ht')
-            si_dfs.append(df)
-        
-        si_df = pd.concat(si_dfs)
-        si_df['ht_y'] = df_king.v_height(si_df['bha'],si_df['si'])
-        si_df['ht_diff'] = si_df['ht_y'] - si_df['ht']
+        bha = king_data.bha
+        si = king_data.si
+        ht = king_data.ht
+        ht_diff = df_king.v_height(bha, si) - ht
         
         # TODO: find out why BHA <10 does validate
-        m = (si_df['bha']>=10) & (si_df['ht_diff'].abs()>0.2)
+        m = (bha>=10) & (np.abs(ht_diff)>0.2)
         
-        v = si_df.loc[m]
-        if v.shape[0]>0:
+        if m.any():
             print('King Validation Errors')
-            print(v)
+            print(pd.DataFrame({'bha':bha[m], 'si':si[m], 'ht':ht[m]
+                    , 'ht_diff':ht_diff[m]}))
             raise AssertionError()
         
 class Test_RA_Harrington(unittest.TestCase):
@@ -141,17 +183,14 @@ class Test_RA_Harrington(unittest.TestCase):
     Test the Harrington (1986) Red alder SiteCurve subclass functions.
     """
     
-    # test data
-    si = pd.Series([30,50,70])
-    bha = pd.Series([20,35])
-    ht = pd.DataFrame.from_records([
+    # test data, ht has one row per si and one column per bha
+    si = np.array([30,50,70], dtype=np.float64)
+    bha = np.array([20,35], dtype=np.float64)
+    ht = np.array([
         [30.0,44.4],
         [50.0,69.3],
         [70.0,91.1]
         ])
-    ht.index = si
-    ht.index.name = 'si'
-    ht.columns = bha
     
     def test_height(self):
         """
@@ -159,12 +198,9 @@ class Test_RA_Harrington(unittest.TestCase):
         """
         sc = site_index.si.RA_Harrington_SiteCurve()
         
-        for a in self.bha:
-            for i in self.si:
-                ht = self.ht.loc[i,a]
-                hx = sc.height(a, i)
-#                 print(a,i,ht,hx)
-                assert abs(hx-ht)<0.1
+        bha, si = np.meshgrid(self.bha, self.si)
+        hx = sc.v_height(bha.ravel(), si.ravel())
+        np.testing.assert_allclose(hx, self.ht.ravel(), rtol=0, atol=0.1)
 
     def test_site_index(self):
         """
@@ -174,11 +210,169 @@ class Test_RA_Harrington(unittest.TestCase):
         
         # FIXME: Harrington SI function is independent of the height function
         #        Is this consistent with other uses of SI/height growth curves
-        for a in self.bha:
-            for i in self.si:
-                ht = self.ht.loc[i,a]
-                sx = sc.site_index(a, ht)
-                assert abs(i-sx)<0.1
+        bha, si = np.meshgrid(self.bha, self.si)
+        sx = sc.v_site_index(bha.ravel(), self.ht.ravel())
+        np.testing.assert_allclose(sx, si.ravel(), rtol=0, atol=0.1)
+
+    def test_sequence_args(self):
+        """
+        Test Harrington (1986) height with pandas and list arguments.
+        """
+        sc = site_index.si.RA_Harrington_SiteCurve()
+        
+        bha, si = np.meshgrid(self.bha, self.si)
+        ht = self.ht.ravel()
+        hx = sc.height(pd.Series(bha.ravel()), list(si.ravel()))
+        np.testing.assert_allclose(hx, ht, rtol=0, atol=0.1)
+
+    def test_site_index_array(self):
+        """
+        Test Harrington (1986) site index search with array arguments.
+        """
+        sc = site_index.si.RA_Harrington_SiteCurve()
+
+        bha, si = np.meshgrid(self.bha, self.si)
+        ht = self.ht
+        sx = sc.site_index(bha, ht)
+        assert sx.shape == ht.shape
+        assert np.all(np.abs(si-sx)<0.1)
+        assert np.all(np.abs(sc.v_height(bha, sx)-ht)<=0.1)
+
+class Test_Series_Args(unittest.TestCase):
+    """
+    Test the closed form curves return pandas Series for Series arguments.
+    """
+
+    curves = (
+        site_index.si.DF_King_SiteCurve
+        , site_index.si.WH_Wiley_SiteCurve
+        , site_index.si.DF_Bruce_SiteCurve
+        , site_index.si.RA_Harrington_SiteCurve
+        , site_index.si.SS_Farr_SiteCurve
+        , site_index.si.DF_Curtis_SiteCurve
+        )
+
+    bha = pd.Series([20.0, 50.0, 75.0], index=[3, 5, 8])
+    ht = pd.Series([40.0, 100.0, 125.0], index=[3, 5, 8])
+
+    def test_series_index(self):
+        """
+        Height and site index keep the index of Series arguments.
+        """
+        for c in self.curves:
+            sc = c()
+            hx = sc.height(self.bha, 100.0)
+            assert isinstance(hx, pd.Series)
+            pd.testing.assert_index_equal(hx.index, self.bha.index)
+            np.testing.assert_allclose(hx, sc.height(self.bha.values, 100.0))
+
+        for c in (site_index.si.DF_King_SiteCurve, site_index.si.WH_Wiley_SiteCurve):
+            sx = c().site_index(self.bha, self.ht)
+            assert isinstance(sx, pd.Series)
+            pd.testing.assert_index_equal(sx.index, self.ht.index)
+
+class Test_Jit_Fallback(unittest.TestCase):
+    """
+    Test the decorators used when Numba is not installed.
+    """
+
+    def test_vectorize_zero_age(self):
+        """
+        Division by a zero age returns inf or nan instead of raising.
+        """
+        def inv_ht(bha, si):
+            return 4.5 + si/bha
+
+        with mock.patch.object(site_index._jit, 'HAS_NUMBA', False):
+            func = site_index._jit.vectorize(['float64(float64, float64)'])(inv_ht)
+
+        ht = func(np.array([0.0, 0.0, 10.0]), np.array([100.0, 0.0, 100.0]))
+        assert np.isinf(ht[0])
+        assert np.isnan(ht[1])
+        np.testing.assert_allclose(ht[2], 14.5)
+        assert np.isinf(func(0.0, 100.0))
+
+class Test_Find_Age(unittest.TestCase):
+    """
+    Test the misc_hg_funcs find_age search.
+    """
+
+    def test_find_age(self):
+        """
+        Heights on the curve are inverted, others saturate or return NaN.
+        """
+        from site_index.misc_hg_funcs import df_king_ht, find_age
+
+        si = np.array([120.0, 120.0, 120.0, 120.0])
+        ht = np.array([133.892, 1000.0, 1.0, np.nan])
+        for method in ('chandrupatla', 'newton'):
+            age = find_age(df_king_ht, si, ht, method=method)
+            np.testing.assert_allclose(age, [60.0, 300.0, 0.0, np.nan], atol=0.01)
+
+            x = find_age(df_king_ht, 120.0, 1000.0, method=method)
+            assert x == 300.0
+
+    def test_find_age_converged(self):
+        """
+        Random heights are inverted to the height tolerance.
+        """
+        from site_index.misc_hg_funcs import df_king_ht, wh_fvs_ht, find_age
+
+        rng = np.random.RandomState(1966)
+        si = rng.uniform(50.0, 160.0, 5000)
+        bha = rng.uniform(1.0, 250.0, 5000)
+        for ht_func in (df_king_ht, wh_fvs_ht):
+            ht = ht_func(bha, si)
+            for method in ('chandrupatla', 'newton'):
+                age = find_age(ht_func, si, ht, method=method)
+                np.testing.assert_allclose(ht_func(age, si), ht, rtol=0, atol=1e-6)
+
+        with self.assertWarns(RuntimeWarning):
+            find_age(df_king_ht, si, df_king_ht(bha, si), steps=2)
+
+    def test_find_age_zero_age(self):
+        """
+        Height functions that divide by age do not fail at the bracket.
+        """
+        from site_index.misc_hg_funcs import df_king_ht, ra_harringtion_ht, find_age
+
+        age = find_age(ra_harringtion_ht, 50.0, 40.0, max_age=100.0)
+        assert not np.isnan(age)
+        assert find_age(df_king_ht, 4.5, 90.0) == 300.0
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+except ImportError:
+    plt = None
+
+@unittest.skipIf(plt is None, 'matplotlib is not available')
+class Test_Plots(unittest.TestCase):
+    """
+    Smoke test the SiteCurve plotting methods.
+    """
+    
+    curves = (
+        site_index.si.DF_King_SiteCurve
+        , site_index.si.WH_Wiley_SiteCurve
+        , site_index.si.DF_Bruce_SiteCurve
+        , site_index.si.RA_Harrington_SiteCurve
+        , site_index.si.SS_Farr_SiteCurve
+        , site_index.si.DF_Curtis_SiteCurve
+        )
+    
+    def test_plots(self):
+        """
+        Draw each plot for each closed form curve.
+        """
+        for c in self.curves:
+            sc = c()
+            for plot in (sc.plot_height_growth, sc.plot_height_curves
+                    , sc.plot_site_index_curves):
+                fig, ax = plt.subplots()
+                plot(ax=ax)
+                plt.close(fig)
 
 class Test_FVS_SiteCurves(unittest.TestCase):
     pass